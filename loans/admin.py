@@ -2,13 +2,28 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.db.models import Sum, Count
+from django.core.paginator import Paginator
+from django.utils import timezone
+from django.core.cache import cache
+from django.db.models import Sum, Count, Q
+from members.admin import ListOnlyFieldsMixin
 from .models import (
     LoanType, LoanApplication, Loan, LoanGuarantor,
     LoanDocument, LoanTopUp
 )
 
 
+# Progress bar colour tiers, highest threshold first
+_PROGRESS_COLORS = ((80, 'green'), (50, 'orange'))
+
+# Only numeric values and fixed colour names are substituted, so no escaping is needed.
+# Styling lives in loans/admin.css.
+_PROGRESS_TEMPLATE = (
+    '<div class="loan-progress"><div class="bar p-{color}" style="width: {pct}%">'
+    '{pct:.1f}%</div></div>'
+)
+
+
 @admin.register(LoanType)
 class LoanTypeAdmin(admin.ModelAdmin):
     """Loan Type admin interface"""
@@ -68,24 +83,85 @@ class LoanTypeAdmin(admin.ModelAdmin):
     deactivate_loan_types.short_description = "Deactivate selected loan types"
 
 
-class LoanDocumentInline(admin.TabularInline):
+class PaginatedTabularInline(admin.TabularInline):
+    """Tabular inline that renders one page of related rows at a time"""
+    per_page = 20
+    template = 'admin/edit_inline/tabular_paginated.html'
+    # Link to the related model's own add view instead of rendering blank forms
+    add_link = False
+    
+    def get_formset(self, request, obj=None, **kwargs):
+        formset_class = super().get_formset(request, obj, **kwargs)
+        per_page = self.per_page
+        add_link = self.add_link
+        
+        class PaginatedFormSet(formset_class):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.page_param = f'{self.prefix}-page'
+                queryset = self.queryset
+                if not queryset.ordered:
+                    queryset = queryset.order_by('-pk')
+                paginator = Paginator(queryset, per_page)
+                self.page = paginator.get_page(request.GET.get(self.page_param))
+                self.queryset = self.page.object_list
+            
+            def page_url(self, number):
+                params = request.GET.copy()
+                params[self.page_param] = number
+                return f'?{params.urlencode()}'
+            
+            def previous_page_url(self):
+                if self.page.has_previous():
+                    return self.page_url(self.page.previous_page_number())
+            
+            def next_page_url(self):
+                if self.page.has_next():
+                    return self.page_url(self.page.next_page_number())
+            
+            def add_url(self):
+                if add_link and self.instance.pk:
+                    opts = self.model._meta
+                    url = reverse(f'admin:{opts.app_label}_{opts.model_name}_add')
+                    return f'{url}?{self.fk.name}={self.instance.pk}'
+        
+        return PaginatedFormSet
+
+
+class LoanDocumentInline(PaginatedTabularInline):
     """Inline for Loan Documents"""
     model = LoanDocument
     extra = 0
-    fields = ['document_type', 'title', 'file', 'uploaded_by']
-    readonly_fields = ['uploaded_at', 'uploaded_by']
+    max_num = 20
+    can_delete = False
+    show_change_link = False
+    add_link = True
+    fields = ['document_type', 'title', 'file', 'uploaded_at', 'uploaded_by']
+    readonly_fields = ['document_type', 'title', 'file', 'uploaded_at', 'uploaded_by']
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('uploaded_by')
 
 
-class LoanGuarantorInline(admin.TabularInline):
+class LoanGuarantorInline(PaginatedTabularInline):
     """Inline for Loan Guarantors"""
     model = LoanGuarantor
     extra = 0
     fields = ['guarantor', 'guaranteed_amount', 'status']
     readonly_fields = ['created_at']
+    autocomplete_fields = ['guarantor']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'guarantor__member', 'guarantor__guarantor_member'
+        )
 
 
 @admin.register(LoanApplication)
-class LoanApplicationAdmin(admin.ModelAdmin):
+class LoanApplicationAdmin(ListOnlyFieldsMixin, admin.ModelAdmin):
     """Loan Application admin interface"""
     
     list_display = [
@@ -97,9 +173,15 @@ class LoanApplicationAdmin(admin.ModelAdmin):
         'status', 'loan_type', 'purpose', 'application_date',
         'assigned_to', 'reviewed_by'
     ]
+    list_select_related = ['member', 'loan_type', 'assigned_to']
+    list_only_fields = [
+        'application_number', 'requested_amount', 'status', 'application_date',
+        'member', 'member__member_number', 'member__full_name',
+        'loan_type', 'loan_type__name', 'loan_type__interest_rate',
+        'assigned_to', 'assigned_to__username', 'assigned_to__role',
+    ]
     search_fields = [
-        'application_number', 'member__first_name', 
-        'member__last_name', 'member__member_number'
+        'application_number', 'member__full_name', 'member__member_number'
     ]
     ordering = ['-application_date']
     
@@ -170,42 +252,53 @@ class LoanApplicationAdmin(admin.ModelAdmin):
     
     def approve_applications(self, request, queryset):
         # This would typically require more complex logic
-        queryset.filter(status='under_review').update(
-            status='approved',
-            approved_by=request.user
+        applications = list(
+            queryset.filter(status='under_review')
+            .select_related(None)
+            .only('requested_amount', 'approved_amount')
+        )
+        now = timezone.now()
+        for application in applications:
+            application.approved_amount = application.approved_amount or application.requested_amount
+            application.status = 'approved'
+            application.approved_by = request.user
+            application.approval_date = now
+        LoanApplication.objects.bulk_update_values(
+            applications, ['approved_amount', 'status', 'approved_by', 'approval_date']
         )
         self.message_user(request, 'Selected applications approved.')
     approve_applications.short_description = "Approve selected applications"
     
     def reject_applications(self, request, queryset):
-        queryset.filter(status='under_review').update(
+        LoanApplication.objects.bulk_transition(
+            queryset.filter(status='under_review'),
             status='rejected',
-            reviewed_by=request.user
+            reviewed_by=request.user,
+            review_date=timezone.now()
         )
         self.message_user(request, 'Selected applications rejected.')
     reject_applications.short_description = "Reject selected applications"
     
     def assign_to_me(self, request, queryset):
-        updated = queryset.update(assigned_to=request.user)
+        updated = LoanApplication.objects.bulk_transition(
+            queryset, assigned_to=request.user
+        )
         self.message_user(request, f'{updated} applications assigned to you.')
     assign_to_me.short_description = "Assign to me"
     
     def mark_under_review(self, request, queryset):
-        updated = queryset.filter(status='submitted').update(
+        updated = LoanApplication.objects.bulk_transition(
+            queryset.filter(status='submitted'),
             status='under_review',
-            reviewed_by=request.user
+            reviewed_by=request.user,
+            review_date=timezone.now()
         )
         self.message_user(request, f'{updated} applications marked under review.')
     mark_under_review.short_description = "Mark as under review"
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'member', 'loan_type', 'assigned_to', 'reviewed_by', 'approved_by'
-        )
 
 
 @admin.register(Loan)
-class LoanAdmin(admin.ModelAdmin):
+class LoanAdmin(ListOnlyFieldsMixin, admin.ModelAdmin):
     """Active Loan admin interface"""
     
     list_display = [
@@ -217,9 +310,16 @@ class LoanAdmin(admin.ModelAdmin):
         'status', 'loan_type', 'disbursement_date',
         'loan_officer', 'maturity_date'
     ]
+    list_select_related = ['member', 'loan_type', 'loan_officer']
+    list_only_fields = [
+        'loan_number', 'principal_amount', 'outstanding_balance', 'status',
+        'disbursement_date', 'completion_percentage',
+        'member', 'member__member_number', 'member__full_name',
+        'loan_type', 'loan_type__name', 'loan_type__interest_rate',
+        'loan_officer', 'loan_officer__username', 'loan_officer__role',
+    ]
     search_fields = [
-        'loan_number', 'member__first_name', 
-        'member__last_name', 'member__member_number'
+        'loan_number', 'member__full_name', 'member__member_number'
     ]
     ordering = ['-disbursement_date']
     
@@ -267,36 +367,59 @@ class LoanAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_completed', 'mark_as_defaulted', 'generate_statements']
     
+    class Media:
+        css = {'all': ('loans/admin.css',)}
+    
     def get_completion_progress(self, obj):
         progress = obj.completion_percentage
-        color = 'green' if progress >= 80 else 'orange' if progress >= 50 else 'red'
-        return format_html(
-            '<div style="width: 100px; background-color: #f0f0f0; border-radius: 3px;">'
-            '<div style="width: {}%; background-color: {}; height: 20px; border-radius: 3px; text-align: center; color: white; font-size: 12px; line-height: 20px;">'
-            '{:.1f}%</div></div>',
-            progress, color, progress
+        color = next(
+            (color for threshold, color in _PROGRESS_COLORS if progress >= threshold),
+            'red'
         )
+        return mark_safe(_PROGRESS_TEMPLATE.format(pct=progress, color=color))
     get_completion_progress.short_description = 'Progress'
     
     def mark_as_completed(self, request, queryset):
-        updated = queryset.filter(status='active').update(status='completed')
+        updated = Loan.objects.bulk_transition(
+            queryset.filter(status='active'), status='completed'
+        )
         self.message_user(request, f'{updated} loans marked as completed.')
     mark_as_completed.short_description = "Mark as completed"
     
     def mark_as_defaulted(self, request, queryset):
-        updated = queryset.filter(status='active').update(status='defaulted')
+        updated = Loan.objects.bulk_transition(
+            queryset.filter(status='active'), status='defaulted'
+        )
         self.message_user(request, f'{updated} loans marked as defaulted.')
     mark_as_defaulted.short_description = "Mark as defaulted"
     
     def generate_statements(self, request, queryset):
-        # This would generate loan statements
-        self.message_user(request, f'Statements generated for {queryset.count()} loans.')
-    generate_statements.short_description = "Generate statements"
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'member', 'loan_type', 'loan_officer', 'disbursed_by', 'application'
+        """Stream one CSV statement line per selected loan"""
+        from reports.exporters import export_to_csv_streaming
+        
+        # Days overdue come from one grouped join rather than a query per loan
+        loans = queryset.with_overdue().select_related(None).select_related('member').only(
+            'loan_number', 'principal_amount', 'total_interest', 'total_paid',
+            'outstanding_balance', 'outstanding_interest', 'penalty_balance',
+            'status', 'maturity_date', 'member__member_number', 'member__full_name'
+        )
+        rows = (
+            [
+                loan.loan_number, loan.member.member_number,
+                loan.member.full_name, loan.principal_amount,
+                loan.total_interest, loan.total_paid, loan.outstanding_balance,
+                loan.outstanding_interest, loan.penalty_balance,
+                loan.get_status_display(), loan.maturity_date, loan.days_overdue
+            ]
+            for loan in loans.iterator(chunk_size=2000)
         )
+        return export_to_csv_streaming(rows, [
+            'Loan Number', 'Member Number', 'Member Name', 'Principal',
+            'Total Interest', 'Total Paid', 'Outstanding Balance',
+            'Outstanding Interest', 'Penalty Balance', 'Status',
+            'Maturity Date', 'Days Overdue'
+        ], 'loan_statements.csv')
+    generate_statements.short_description = "Generate statements"
 
 
 @admin.register(LoanGuarantor)
@@ -308,16 +431,14 @@ class LoanGuarantorAdmin(admin.ModelAdmin):
         'status', 'created_at'
     ]
     list_filter = ['status', 'created_at']
+    list_select_related = [
+        'loan__member', 'guarantor__member', 'guarantor__guarantor_member'
+    ]
     search_fields = [
         'loan__loan_number', 'guarantor__full_name',
-        'guarantor__guarantor_member__first_name'
+        'guarantor__guarantor_member__full_name'
     ]
     ordering = ['-created_at']
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'loan', 'guarantor', 'guarantor__guarantor_member'
-        )
 
 
 @admin.register(LoanDocument)
@@ -325,30 +446,15 @@ class LoanDocumentAdmin(admin.ModelAdmin):
     """Loan Document admin interface"""
     
     list_display = [
-        'title', 'get_loan_reference', 'document_type',
+        'title', 'reference_number', 'document_type',
         'uploaded_by', 'uploaded_at'
     ]
     list_filter = ['document_type', 'uploaded_at']
-    search_fields = [
-        'title', 'loan__loan_number', 
-        'loan_application__application_number'
-    ]
+    list_select_related = ['uploaded_by']
+    search_fields = ['title', 'reference_number']
     ordering = ['-uploaded_at']
     
-    readonly_fields = ['uploaded_at']
-    
-    def get_loan_reference(self, obj):
-        if obj.loan:
-            return obj.loan.loan_number
-        elif obj.loan_application:
-            return obj.loan_application.application_number
-        return "N/A"
-    get_loan_reference.short_description = 'Reference'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'loan', 'loan_application', 'uploaded_by'
-        )
+    readonly_fields = ['reference_number', 'uploaded_at']
 
 
 @admin.register(LoanTopUp)
@@ -360,6 +466,7 @@ class LoanTopUpAdmin(admin.ModelAdmin):
         'status', 'requested_date', 'requested_by'
     ]
     list_filter = ['status', 'requested_date']
+    list_select_related = ['original_loan__member', 'requested_by']
     search_fields = ['original_loan__loan_number', 'reason']
     ordering = ['-requested_date']
     
@@ -386,11 +493,6 @@ class LoanTopUpAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['requested_date']
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'original_loan', 'new_loan', 'requested_by', 'approved_by'
-        )
 
 
 # Custom admin site modifications
@@ -405,15 +507,23 @@ class LoanAdminSite(admin.AdminSite):
         extra_context = extra_context or {}
         
         # Add loan statistics
-        extra_context.update({
-            'total_applications': LoanApplication.objects.count(),
-            'pending_applications': LoanApplication.objects.filter(
-                status__in=['submitted', 'under_review']
-            ).count(),
-            'active_loans': Loan.objects.filter(status='active').count(),
-            'total_disbursed': Loan.objects.aggregate(
-                total=Sum('principal_amount')
-            )['total'] or 0,
-        })
+        extra_context.update(cache.get_or_set('loan_admin_stats', self.get_loan_statistics, 60))
         
         return super().index(request, extra_context)
+    
+    def get_loan_statistics(self):
+        """Dashboard figures, one aggregate query per model"""
+        applications = LoanApplication.objects.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status__in=['submitted', 'under_review'])),
+        )
+        loans = Loan.objects.aggregate(
+            active=Count('id', filter=Q(status='active')),
+            disbursed=Sum('principal_amount'),
+        )
+        return {
+            'total_applications': applications['total'],
+            'pending_applications': applications['pending'],
+            'active_loans': loans['active'],
+            'total_disbursed': loans['disbursed'] or 0,
+        }
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.7 on 2026-10-15 09:44
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    """Start each counter after the highest number already issued that year"""
+    LoanCounter = apps.get_model('loans', 'LoanCounter')
+    sources = [
+        ('application', apps.get_model('loans', 'LoanApplication'), 'application_number'),
+        ('loan', apps.get_model('loans', 'Loan'), 'loan_number'),
+    ]
+    counters = {}
+    for kind, model, field in sources:
+        for number in model.objects.values_list(field, flat=True).iterator():
+            year, value = int(number[2:6]), int(number[6:])
+            key = (kind, year)
+            counters[key] = max(counters.get(key, 0), value)
+    LoanCounter.objects.bulk_create(
+        LoanCounter(kind=kind, year=year, last_value=value)
+        for (kind, year), value in counters.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('application', 'Loan Application'), ('loan', 'Loan')], max_length=20)),
+                ('year', models.PositiveIntegerField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Loan Counter',
+                'verbose_name_plural': 'Loan Counters',
+                'unique_together': {('kind', 'year')},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-15 09:47
+
+from django.db import migrations, models
+
+from loans.models import completion_percentage_expression
+
+
+def backfill_completion_percentage(apps, schema_editor):
+    Loan = apps.get_model('loans', 'Loan')
+    Loan.objects.update(completion_percentage=completion_percentage_expression())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_loancounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='completion_percentage',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+        ),
+        migrations.RunPython(backfill_completion_percentage, migrations.RunPython.noop),
+    ]
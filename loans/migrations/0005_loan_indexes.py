@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-15 09:47
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_loan_completion_percentage'),
+        ('members', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['-disbursement_date'], name='loans_loan_disburs_cb6256_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', '-disbursement_date'], name='loans_loan_status_3d9f17_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['maturity_date'], name='loans_loan_maturit_814b20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status', 'active')), fields=['disbursement_date'], name='loan_active_disb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['-application_date'], name='loans_loana_applica_ed5822_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['status', '-application_date'], name='loans_loana_status_b2cdd7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['loan_type', 'status'], name='loans_loana_loan_ty_069886_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-15 09:51
+
+from django.db import migrations, models
+
+
+def backfill_reference_number(apps, schema_editor):
+    LoanDocument = apps.get_model('loans', 'LoanDocument')
+    documents = LoanDocument.objects.select_related('loan', 'loan_application')
+    batch = []
+    for document in documents.iterator(chunk_size=2000):
+        if document.loan:
+            document.reference_number = document.loan.loan_number
+        elif document.loan_application:
+            document.reference_number = document.loan_application.application_number
+        else:
+            continue
+        batch.append(document)
+    LoanDocument.objects.bulk_update(batch, ['reference_number'], batch_size=30000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_loan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loandocument',
+            name='reference_number',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.RunPython(backfill_reference_number, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-15 11:40
+
+from django.db import migrations
+
+from loans.models import completion_percentage_expression
+
+
+def recompute_completion_percentage(apps, schema_editor):
+    # Values written before the division was done in whole cents were
+    # truncated on SQLite
+    Loan = apps.get_model('loans', 'Loan')
+    Loan.objects.update(completion_percentage=completion_percentage_expression())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(recompute_completion_percentage, migrations.RunPython.noop),
+    ]
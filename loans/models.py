@@ -1,10 +1,61 @@
-from django.db import models
+from django.db import models, connection, transaction
+from django.db.models import Case, F, Min, Q, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.db.models.lookups import Exact, GreaterThan
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
-from decimal import Decimal
-from datetime import date, timedelta
+from django.utils import timezone
+from decimal import Decimal, localcontext
+from datetime import date
+from functools import cached_property
+import calendar
 import uuid
 
+from .numbers import next_numbers
+
+
+_HUNDRED = Decimal('100')
+_TWELVE = Decimal('12')
+_ONE = Decimal('1')
+
+
+def add_months(start, months):
+    """Shift a date by whole calendar months, clamping to the end of short months"""
+    month_index = start.month - 1 + months
+    year, month = start.year + month_index // 12, month_index % 12 + 1
+    day = min(start.day, calendar.monthrange(year, month)[1])
+    return start.replace(year=year, month=month, day=day)
+
+
+def completion_percentage_expression():
+    """Loan.completion_percentage worked out by the database, with the
+    result calculate_completion_percentage() gives
+    
+    Amounts are taken in whole cents and divided as integers, with the
+    remainder rounded half to even as Decimal.quantize() does; SQLite
+    stores whole amounts as integers, so dividing them directly would
+    truncate there.
+    """
+    def cents(expression):
+        return Cast(Round(expression * 100), models.BigIntegerField())
+    
+    total = NullIf(cents(F('principal_amount') + F('total_interest')), 0)
+    # In hundredths of a percent
+    numerator = cents(F('total_paid')) * 10000
+    quotient = numerator / total
+    remainder = numerator - quotient * total
+    rounded = quotient + Case(
+        When(GreaterThan(remainder * 2, total), then=Value(1)),
+        When(Exact(remainder * 2, total), then=quotient - quotient / 2 * 2),
+        default=Value(0),
+        output_field=models.BigIntegerField()
+    )
+    return Coalesce(
+        rounded * Value(Decimal('0.01')),
+        Value(Decimal('0.00')),
+        output_field=models.DecimalField(max_digits=5, decimal_places=2)
+    )
+
 
 class LoanType(models.Model):
     """Different types of loans offered by the SACCO"""
@@ -60,6 +111,169 @@ class LoanType(models.Model):
         return f"{self.name} ({self.interest_rate}%)"
 
 
+class LoanCounter(models.Model):
+    """Per-year counters used to mint application and loan numbers"""
+    
+    KIND_CHOICES = [
+        ('application', 'Loan Application'),
+        ('loan', 'Loan'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    year = models.PositiveIntegerField()
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Loan Counter'
+        verbose_name_plural = 'Loan Counters'
+        unique_together = ['kind', 'year']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.year}: {self.last_value}"
+    
+    @classmethod
+    def reserve(cls, kind, year, n=1):
+        """Reserve the next n numbers for kind/year and return them as a range
+        
+        The counter is bumped and read back by a single UPDATE ... RETURNING,
+        the same round trip a database sequence's nextval() would cost.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_value = last_value + %s "
+                f"WHERE kind = %s AND year = %s RETURNING last_value",
+                [n, kind, year]
+            )
+            row = cursor.fetchone()
+        if row is None:
+            # First number of the year; create the counter and try again
+            cls.objects.get_or_create(kind=kind, year=year)
+            return cls.reserve(kind, year, n)
+        return range(row[0] - n + 1, row[0] + 1)
+
+
+class NumberedManager(models.Manager):
+    """Manager for workflow models carrying a yearly sequential reference number"""
+    
+    number_field = None
+    number_prefix = None
+    
+    def assign_numbers(self, objs):
+        """Give every unnumbered object the next number from the counter"""
+        pending = [obj for obj in objs if not getattr(obj, self.number_field)]
+        if not pending:
+            return
+        numbers = next_numbers(self.number_prefix, date.today().year, len(pending))
+        for obj, number in zip(pending, numbers):
+            setattr(obj, self.number_field, number)
+    
+    def bulk_create_with_numbers(self, objs, **kwargs):
+        """Reserve numbers for the whole batch up front, then bulk insert"""
+        objs = list(objs)
+        self.assign_numbers(objs)
+        return self.bulk_create(objs, **kwargs)
+    
+    def bulk_transition(self, queryset, **fields):
+        """Apply a workflow transition to every row of queryset in one UPDATE
+        
+        QuerySet.update() skips auto_now, so updated_at is set explicitly.
+        Transitions needing per-row computed values should use
+        bulk_update(objs, fields, batch_size=10000) rather than save() in a loop.
+        """
+        return queryset.update(updated_at=timezone.now(), **fields)
+    
+    def bulk_update_values(self, objs, fields):
+        """Write per-row values of fields for objs with UPDATE ... FROM (VALUES ...)
+        
+        bulk_update() emits a CASE WHEN per column listing every row, which
+        grows quadratically; here the rows are joined in as a VALUES list so
+        each batch is a single linear statement. updated_at is stamped too.
+        """
+        objs = list(objs)
+        if not objs:
+            return 0
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        
+        opts = self.model._meta
+        model_fields = [opts.pk] + [opts.get_field(name) for name in [*fields, 'updated_at']]
+        qn = connection.ops.quote_name
+        table = qn(opts.db_table)
+        columns = [qn(field.column) for field in model_fields]
+        if connection.vendor == 'sqlite':
+            placeholders = ['%s'] * len(model_fields)
+            # SQLite takes no column list on the alias and names VALUES
+            # columns column1, column2, ...
+            source = 'v'
+            values_columns = [f'column{n}' for n in range(1, len(columns) + 1)]
+        else:
+            # VALUES parameters are untyped text on PostgreSQL
+            placeholders = [f'CAST(%s AS {field.db_type(connection)})' for field in model_fields]
+            source = f"v ({', '.join(columns)})"
+            values_columns = columns
+        row_sql = f"({', '.join(placeholders)})"
+        assignments = ', '.join(
+            f"{column} = v.{value}" for column, value in zip(columns[1:], values_columns[1:])
+        )
+        
+        updated = 0
+        batch_size = connection.ops.bulk_batch_size(model_fields, objs)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start:start + batch_size]
+                params = [
+                    field.get_db_prep_save(getattr(obj, field.attname), connection)
+                    for obj in batch for field in model_fields
+                ]
+                # No WITH clause, as sqlite3 reports no rowcount for one
+                cursor.execute(
+                    f"UPDATE {table} SET {assignments} "
+                    f"FROM (VALUES {', '.join([row_sql] * len(batch))}) AS {source} "
+                    f"WHERE {table}.{columns[0]} = v.{values_columns[0]}",
+                    params
+                )
+                updated += cursor.rowcount
+        return updated
+
+
+class LoanApplicationManager(NumberedManager):
+    number_field = 'application_number'
+    number_prefix = 'LA'
+
+
+class LoanQuerySet(models.QuerySet):
+    
+    def with_overdue(self):
+        """Annotate each loan with its earliest overdue unpaid installment date
+        
+        Loan.days_overdue reads the annotation instead of querying the
+        schedule once per loan.
+        """
+        from repayments.models import STATUS_OVERDUE, STATUS_PENDING
+        
+        return self.annotate(
+            _earliest_overdue=Min(
+                'repayment_schedule__due_date',
+                filter=Q(
+                    repayment_schedule__status__in=[STATUS_PENDING, STATUS_OVERDUE],
+                    repayment_schedule__due_date__lt=date.today()
+                )
+            )
+        )
+
+
+class LoanManager(NumberedManager.from_queryset(LoanQuerySet)):
+    number_field = 'loan_number'
+    number_prefix = 'LN'
+    
+    def refresh_completion(self, queryset=None):
+        """Recompute the stored completion_percentage for queryset in one UPDATE"""
+        queryset = self.all() if queryset is None else queryset
+        return queryset.update(completion_percentage=completion_percentage_expression())
+
+
 class LoanApplication(models.Model):
     """Loan application submitted by members"""
     
@@ -132,63 +346,65 @@ class LoanApplication(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LoanApplicationManager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Loan Application'
         verbose_name_plural = 'Loan Applications'
+        indexes = [
+            models.Index(fields=['-application_date']),
+            models.Index(fields=['status', '-application_date']),
+            models.Index(fields=['loan_type', 'status']),
+        ]
     
     def __str__(self):
-        return f"{self.application_number} - {self.member.get_full_name()}"
+        return f"{self.application_number} - {self.member.full_name}"
     
     def save(self, *args, **kwargs):
-        if not self.application_number:
-            # Generate application number
-            year = date.today().year
-            last_app = LoanApplication.objects.filter(
-                application_number__startswith=f"LA{year}"
-            ).order_by('-id').first()
-            
-            if last_app:
-                last_number = int(last_app.application_number[-4:])
-                self.application_number = f"LA{year}{str(last_number + 1).zfill(4)}"
-            else:
-                self.application_number = f"LA{year}0001"
+        # Generate application number
+        LoanApplication.objects.assign_numbers([self])
         
         super().save(*args, **kwargs)
     
-    @property
+    @cached_property
     def calculated_interest(self):
         """Calculate total interest based on loan type"""
         if not self.approved_amount:
             amount = self.requested_amount
         else:
             amount = self.approved_amount
-            
-        rate = self.loan_type.interest_rate / 100
+        
+        rate = self.loan_type.interest_rate / _HUNDRED
+        # Keep the term as a Decimal; mixing in a float raises TypeError
+        years = Decimal(self.term_months) / _TWELVE
         
         if self.loan_type.interest_calculation_method == 'flat':
-            return amount * rate * (self.term_months / 12)
+            return amount * rate * years
         elif self.loan_type.interest_calculation_method == 'reducing':
             # Simplified reducing balance calculation
-            monthly_rate = rate / 12
+            monthly_rate = rate / _TWELVE
             return amount * monthly_rate * self.term_months
         else:
-            # Compound interest
-            return amount * ((1 + rate) ** (self.term_months / 12) - 1)
+            # Compound interest; a fractional Decimal power only needs bounded precision
+            with localcontext() as ctx:
+                ctx.prec = 12
+                growth = (_ONE + rate) ** years - _ONE
+            return amount * growth
     
-    @property
+    @cached_property
     def processing_fee(self):
         """Calculate processing fee"""
         amount = self.approved_amount or self.requested_amount
-        return amount * (self.loan_type.processing_fee_rate / 100)
+        return amount * (self.loan_type.processing_fee_rate / _HUNDRED)
     
-    @property
+    @cached_property
     def total_repayment(self):
         """Calculate total amount to be repaid"""
         amount = self.approved_amount or self.requested_amount
         return amount + self.calculated_interest
     
-    @property
+    @cached_property
     def monthly_repayment(self):
         """Calculate monthly repayment amount"""
         return self.total_repayment / self.term_months
@@ -229,6 +445,7 @@ class Loan(models.Model):
     outstanding_interest = models.DecimalField(max_digits=12, decimal_places=2)
     total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     penalty_balance = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    completion_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0, editable=False)
     
     # Staff
     loan_officer = models.ForeignKey(
@@ -247,49 +464,63 @@ class Loan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = LoanManager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Loan'
         verbose_name_plural = 'Loans'
+        indexes = [
+            models.Index(fields=['-disbursement_date']),
+            models.Index(fields=['status', '-disbursement_date']),
+            models.Index(fields=['maturity_date']),
+            models.Index(
+                fields=['disbursement_date'],
+                condition=models.Q(status='active'),
+                name='loan_active_disb_idx'
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.loan_number} - {self.member.get_full_name()}"
+        return f"{self.loan_number} - {self.member.full_name}"
     
     def save(self, *args, **kwargs):
-        if not self.loan_number:
-            # Generate loan number
-            year = date.today().year
-            last_loan = Loan.objects.filter(
-                loan_number__startswith=f"LN{year}"
-            ).order_by('-id').first()
-            
-            if last_loan:
-                last_number = int(last_loan.loan_number[-4:])
-                self.loan_number = f"LN{year}{str(last_number + 1).zfill(4)}"
-            else:
-                self.loan_number = f"LN{year}0001"
+        # Generate loan number
+        Loan.objects.assign_numbers([self])
         
         # Calculate maturity date
         if self.disbursement_date and not self.maturity_date:
-            self.maturity_date = self.disbursement_date + timedelta(days=self.term_months * 30)
+            self.maturity_date = add_months(self.disbursement_date, self.term_months)
         
         # Calculate first repayment date (usually next month)
         if self.disbursement_date and not self.first_repayment_date:
-            self.first_repayment_date = self.disbursement_date + timedelta(days=30)
+            self.first_repayment_date = add_months(self.disbursement_date, 1)
+        
+        self.completion_percentage = self.calculate_completion_percentage()
         
         super().save(*args, **kwargs)
     
     @property
     def days_overdue(self):
-        """Calculate number of days overdue"""
+        """Calculate number of days overdue
+        
+        Not cached on the instance, as it depends on schedule rows that
+        payments change after the loan is loaded.
+        """
         if self.status != 'active':
             return 0
         
-        from repayments.models import RepaymentSchedule
+        # Use the with_overdue() annotation when available
+        if hasattr(self, '_earliest_overdue'):
+            if self._earliest_overdue is None:
+                return 0
+            return (date.today() - self._earliest_overdue).days
+        
+        from repayments.models import STATUS_OVERDUE, STATUS_PENDING, RepaymentSchedule
         overdue_schedules = RepaymentSchedule.objects.filter(
             loan=self,
             due_date__lt=date.today(),
-            status='pending'
+            status__in=[STATUS_PENDING, STATUS_OVERDUE]
         )
         
         if overdue_schedules.exists():
@@ -302,13 +533,12 @@ class Loan(models.Model):
         """Check if loan has overdue payments"""
         return self.days_overdue > 0
     
-    @property
-    def completion_percentage(self):
+    def calculate_completion_percentage(self):
         """Calculate loan completion percentage"""
-        if self.principal_amount + self.total_interest == 0:
-            return 0
-        total_loan = self.principal_amount + self.total_interest
-        return (self.total_paid / total_loan) * 100
+        total_loan = Decimal(self.principal_amount) + Decimal(self.total_interest)
+        if total_loan == 0:
+            return Decimal('0.00')
+        return (Decimal(self.total_paid) / total_loan * 100).quantize(Decimal('0.01'))
 
 
 class LoanGuarantor(models.Model):
@@ -364,6 +594,8 @@ class LoanDocument(models.Model):
         null=True,
         blank=True
     )
+    # Denormalized loan/application number so listings don't join either table
+    reference_number = models.CharField(max_length=20, blank=True, db_index=True, editable=False)
     document_type = models.CharField(max_length=30, choices=DOCUMENT_TYPES)
     title = models.CharField(max_length=100)
     file = models.FileField(upload_to='loan_documents/')
@@ -377,9 +609,15 @@ class LoanDocument(models.Model):
         verbose_name_plural = 'Loan Documents'
     
     def __str__(self):
+        return f"{self.title} - {self.reference_number}"
+    
+    def save(self, *args, **kwargs):
         if self.loan:
-            return f"{self.title} - {self.loan.loan_number}"
-        return f"{self.title} - {self.loan_application.application_number}"
+            self.reference_number = self.loan.loan_number
+        elif self.loan_application:
+            self.reference_number = self.loan_application.application_number
+        
+        super().save(*args, **kwargs)
 
 
 class LoanTopUp(models.Model):
@@ -0,0 +1,64 @@
+"""Reference numbers for loan applications (LA{year}NNNN) and loans (LN{year}NNNN)"""
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+import threading
+
+
+PREFIX_KINDS = {
+    'LA': 'application',
+    'LN': 'loan',
+}
+
+# Blocks reserved by preallocate(), keyed by (prefix, year), per thread
+_preallocated = threading.local()
+
+
+def _pools():
+    if not hasattr(_preallocated, 'pools'):
+        _preallocated.pools = {}
+    return _preallocated.pools
+
+
+def format_number(prefix, year, value):
+    return f"{prefix}{year}{str(value).zfill(4)}"
+
+
+def next_numbers(prefix, year, n):
+    """Reserve n consecutive numbers for prefix/year
+    
+    Numbers come from an active preallocate() block when it has enough
+    left, otherwise straight from the database counter.
+    """
+    pool = _pools().get((prefix, year))
+    if pool is not None and len(pool) >= n:
+        values = [pool.popleft() for _ in range(n)]
+    else:
+        from .models import LoanCounter
+        values = LoanCounter.reserve(PREFIX_KINDS[prefix], year, n)
+    return [format_number(prefix, year, value) for value in values]
+
+
+def next_number(prefix, year=None):
+    """Reserve the next number for prefix, in the current year by default"""
+    return next_numbers(prefix, year or date.today().year, 1)[0]
+
+
+@contextmanager
+def preallocate(prefix, n, year=None):
+    """Reserve n numbers in one counter update for the saves made inside the block
+    
+        with preallocate('LA', len(rows)):
+            for row in rows:
+                LoanApplication.objects.create(**row)
+    
+    Numbers still unused when the block exits are abandoned, leaving a gap.
+    """
+    from .models import LoanCounter
+    year = year or date.today().year
+    pools = _pools()
+    pools[(prefix, year)] = deque(LoanCounter.reserve(PREFIX_KINDS[prefix], year, n))
+    try:
+        yield
+    finally:
+        pools.pop((prefix, year), None)
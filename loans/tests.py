@@ -1,3 +1,197 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from members.models import User
+from members.tests import make_member
+
+from .models import Loan, LoanApplication, LoanType, add_months
+from .numbers import format_number, preallocate
+
+
+def make_loan_type():
+    return LoanType.objects.get_or_create(name='Business', defaults={
+        'description': 'Business loan', 'interest_rate': Decimal('12'),
+        'minimum_amount': 1, 'maximum_amount': 100000, 'processing_fee_rate': Decimal('1'),
+    })[0]
+
+
+def make_application(member, **kwargs):
+    return LoanApplication.objects.create(
+        member=member, loan_type=make_loan_type(), requested_amount=Decimal('6000'),
+        term_months=6, purpose='business', purpose_description='Stock', **kwargs
+    )
+
+
+def make_loan(member, installments=6, first_due=None):
+    """An active 6000 loan with an installment of 1060 due every 30 days"""
+    from repayments.models import RepaymentSchedule
+    
+    first_due = first_due or date.today() - timedelta(days=60)
+    loan = Loan.objects.create(
+        application=make_application(member), member=member, loan_type=make_loan_type(),
+        principal_amount=Decimal('6000'), interest_rate=Decimal('12'),
+        term_months=installments, monthly_repayment=Decimal('1060'),
+        total_interest=Decimal('360'), disbursement_date=first_due - timedelta(days=30),
+        outstanding_balance=Decimal('6000'), outstanding_interest=Decimal('360')
+    )
+    for number in range(installments):
+        RepaymentSchedule.objects.create(
+            loan=loan, installment_number=number + 1,
+            due_date=first_due + timedelta(days=30 * number),
+            principal_amount=Decimal('1000'), interest_amount=Decimal('60'),
+            total_amount=Decimal('1060')
+        )
+    return loan
+
+
+class AddMonthsTests(TestCase):
+    
+    def test_clamps_to_the_end_of_short_months(self):
+        self.assertEqual(add_months(date(2026, 1, 31), 1), date(2026, 2, 28))
+        self.assertEqual(add_months(date(2028, 1, 31), 1), date(2028, 2, 29))
+        self.assertEqual(add_months(date(2026, 11, 30), 3), date(2027, 2, 28))
+        self.assertEqual(add_months(date(2026, 3, 15), -3), date(2025, 12, 15))
+
+
+class NumberingTests(TestCase):
+    
+    def test_applications_and_loans_are_numbered_per_prefix(self):
+        year = date.today().year
+        member = make_member()
+        first, second = make_application(member), make_application(member)
+        loan = make_loan(make_member(1), installments=1)
+        self.assertEqual(first.application_number, format_number('LA', year, 1))
+        self.assertEqual(second.application_number, format_number('LA', year, 2))
+        self.assertEqual(loan.application.application_number, format_number('LA', year, 3))
+        self.assertEqual(loan.loan_number, format_number('LN', year, 1))
+    
+    def test_preallocated_block_is_used_in_order(self):
+        year = date.today().year
+        member = make_member()
+        with preallocate('LA', 3):
+            numbers = [make_application(member).application_number for _ in range(2)]
+        after = make_application(member).application_number
+        self.assertEqual(numbers, [format_number('LA', year, 1), format_number('LA', year, 2)])
+        # The unused number in the block is abandoned
+        self.assertEqual(after, format_number('LA', year, 4))
+    
+    def test_bulk_create_reserves_a_block(self):
+        year = date.today().year
+        member = make_member()
+        applications = LoanApplication.objects.bulk_create_with_numbers([
+            LoanApplication(
+                member=member, loan_type=make_loan_type(), requested_amount=Decimal(amount),
+                term_months=6, purpose='business', purpose_description='Stock'
+            )
+            for amount in ['100', '200']
+        ])
+        self.assertEqual(
+            [application.application_number for application in applications],
+            [format_number('LA', year, 1), format_number('LA', year, 2)]
+        )
+
+
+class BulkUpdateValuesTests(TestCase):
+    
+    def test_writes_each_rows_own_values_and_stamps_updated_at(self):
+        member = make_member()
+        applications = [make_application(member) for _ in range(3)]
+        untouched = make_application(member)
+        before = untouched.updated_at
+        for application, amount in zip(applications, ['100.50', '200.00', '300.25']):
+            application.approved_amount = Decimal(amount)
+            application.status = 'approved'
+        
+        updated = LoanApplication.objects.bulk_update_values(
+            applications, ['approved_amount', 'status']
+        )
+        
+        self.assertEqual(updated, 3)
+        rows = LoanApplication.objects.filter(pk__in=[a.pk for a in applications]).order_by('pk')
+        self.assertEqual(
+            [(row.approved_amount, row.status, row.updated_at) for row in rows],
+            [(a.approved_amount, 'approved', a.updated_at) for a in applications]
+        )
+        self.assertGreater(applications[0].updated_at, before)
+        untouched.refresh_from_db()
+        self.assertEqual((untouched.approved_amount, untouched.status), (None, 'draft'))
+        self.assertEqual(untouched.updated_at, before)
+    
+    def test_nothing_to_write(self):
+        self.assertEqual(LoanApplication.objects.bulk_update_values([], ['status']), 0)
+
+
+class OverdueTests(TestCase):
+    
+    def test_days_overdue_from_the_earliest_unpaid_past_installment(self):
+        loan = make_loan(make_member(), first_due=date.today() - timedelta(days=45))
+        self.assertEqual(Loan.objects.with_overdue().get(pk=loan.pk).days_overdue, 45)
+        self.assertEqual(Loan.objects.get(pk=loan.pk).days_overdue, 45)
+
+
+class CompletionPercentageTests(TestCase):
+    
+    def test_refresh_completion_matches_calculate_completion_percentage(self):
+        loan = make_loan(make_member(), installments=1)
+        for paid, principal, interest in [
+            ('500', '6000', '360'), ('3180.00', '6000', '360'), ('0.01', '200', '0'),
+            ('0.03', '200', '0'), ('1234.56', '7654.32', '0'), ('0', '0', '0'),
+        ]:
+            with self.subTest(paid=paid, principal=principal, interest=interest):
+                loans = Loan.objects.filter(pk=loan.pk)
+                loans.update(
+                    total_paid=Decimal(paid), principal_amount=Decimal(principal),
+                    total_interest=Decimal(interest)
+                )
+                Loan.objects.refresh_completion(loans)
+                loan.refresh_from_db()
+                self.assertEqual(loan.completion_percentage, loan.calculate_completion_percentage())
+
+
+class LoanAdminTests(TestCase):
+    
+    def test_generate_statements_streams_one_line_per_loan(self):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        
+        loan = make_loan(make_member(), first_due=date.today() - timedelta(days=45))
+        model_admin = site._registry[Loan]
+        request = RequestFactory().get('/')
+        response = model_admin.generate_statements(request, model_admin.get_queryset(request))
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="loan_statements.csv"')
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('Loan Number,Member Number'))
+        self.assertTrue(lines[1].startswith(f'{loan.loan_number},{loan.member.member_number}'))
+        self.assertTrue(lines[1].endswith(',45'))
+    
+    def test_changelist_queries_do_not_join_the_schedule(self):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        
+        make_loan(make_member())
+        request = RequestFactory().get('/')
+        request.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        with CaptureQueriesContext(connection) as queries:
+            response = site._registry[Loan].changelist_view(request)
+            response.render()
+        self.assertFalse(
+            [query['sql'] for query in queries if 'repayments_repaymentschedule' in query['sql']]
+        )
+    
+    def test_generate_statements_reads_days_overdue_in_one_query(self):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        
+        for number in range(3):
+            make_loan(make_member(number))
+        model_admin = site._registry[Loan]
+        request = RequestFactory().get('/')
+        response = model_admin.generate_statements(request, model_admin.get_queryset(request))
+        with self.assertNumQueries(1):
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.utils.html import format_html
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils.html import escape, format_html
 from django.urls import reverse
+from django.utils.encoding import filepath_to_uri
+from django.utils.functional import cached_property
 from django.utils.safestring import mark_safe
 from .models import (
     User, Member, NextOfKin, Guarantor, 
@@ -9,8 +16,80 @@ from .models import (
 )
 
 
+# Only the escaped photo URL is substituted
+_THUMBNAIL_TEMPLATE = (
+    '<img src="{url}" width="50" height="50" style="border-radius: 50%;" />'
+)
+
+
+class FasterAdminPaginator(Paginator):
+    """Paginator that estimates the count of large unfiltered tables"""
+    estimate_threshold = 10000
+    
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = self.estimated_count()
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
+    
+    def estimated_count(self):
+        # Only PostgreSQL keeps a cheap row estimate in its catalog
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE relname = %s",
+                [self.object_list.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+
+class ListOnlyFieldsMixin:
+    """Load only the columns the changelist renders
+    
+    The change form still gets full rows; only the changelist queryset
+    is narrowed with only(list_only_fields).
+    """
+    list_only_fields = ()
+    
+    def get_changelist(self, request, **kwargs):
+        changelist_class = super().get_changelist(request, **kwargs)
+        only_fields = self.list_only_fields
+        if not only_fields:
+            return changelist_class
+        
+        class OnlyFieldsChangeList(changelist_class):
+            def get_queryset(self, request, exclude_parameters=None):
+                return super().get_queryset(request, exclude_parameters).only(*only_fields)
+        
+        return OnlyFieldsChangeList
+
+
+class OptimizedModelAdmin(admin.ModelAdmin):
+    """ModelAdmin that declares its related-object loading
+    
+    select_related_fields and prefetch_related_fields are applied to every
+    queryset the admin builds, changelist and change views alike.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self.select_related_fields:
+            queryset = queryset.select_related(*self.select_related_fields)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
+
+
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(ListOnlyFieldsMixin, BaseUserAdmin):
     """Custom User admin with role-based management"""
     
     list_display = [
@@ -23,6 +102,7 @@ class UserAdmin(BaseUserAdmin):
     ]
     search_fields = ['username', 'email', 'first_name', 'last_name', 'employee_id']
     ordering = ['-date_joined']
+    list_only_fields = list_display
     
     fieldsets = BaseUserAdmin.fieldsets + (
         ('SACCO Information', {
@@ -35,50 +115,80 @@ class UserAdmin(BaseUserAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at']
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related()
 
 
 class NextOfKinInline(admin.TabularInline):
     """Inline for Next of Kin"""
     model = NextOfKin
-    extra = 1
+    extra = 0
+    show_change_link = True
     fields = ['full_name', 'relationship', 'phone_number', 'national_id', 'is_primary']
+    
+    def get_extra(self, request, obj=None, **kwargs):
+        # Offer a blank form only while registering a new member
+        return 1 if obj is None else 0
 
 
 class GuarantorInline(admin.TabularInline):
     """Inline for Guarantors"""
     model = Guarantor
+    fk_name = 'member'
     extra = 0
+    show_change_link = True
     fields = [
         'guarantor_member', 'full_name', 'collateral_type', 
         'collateral_value', 'status'
     ]
     readonly_fields = ['created_at']
+    raw_id_fields = ['guarantor_member']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('guarantor_member')
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'guarantor_member':
+            kwargs['queryset'] = Member.objects.only(
+                'id', 'member_number', 'full_name'
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
 class MemberDocumentInline(admin.TabularInline):
     """Inline for Member Documents"""
     model = MemberDocument
     extra = 0
+    show_change_link = True
     fields = ['document_type', 'title', 'file', 'uploaded_by']
     readonly_fields = ['uploaded_at', 'uploaded_by']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('uploaded_by')
 
 
 class MemberActivityInline(admin.TabularInline):
     """Inline for Member Activities"""
     model = MemberActivity
     extra = 0
+    show_change_link = True
+    max_num = 10
+    can_delete = False
     fields = ['activity_type', 'title', 'description', 'created_by']
     readonly_fields = ['created_at', 'created_by']
     
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('created_by')[:10]
+        # Keep only each member's 10 most recent activities; the full history
+        # is linked from the member form
+        return super().get_queryset(request).select_related('created_by').annotate(
+            recent_rank=Window(
+                RowNumber(),
+                partition_by=F('member'),
+                order_by=F('created_at').desc()
+            )
+        ).filter(recent_rank__lte=10)
 
 
 @admin.register(Member)
-class MemberAdmin(admin.ModelAdmin):
+class MemberAdmin(OptimizedModelAdmin):
     """Comprehensive Member admin interface"""
     
     list_display = [
@@ -91,10 +201,14 @@ class MemberAdmin(admin.ModelAdmin):
         'assigned_loan_officer', 'registration_date'
     ]
     search_fields = [
-        'member_number', 'national_id', 'first_name', 
-        'last_name', 'phone_number', 'email'
+        'member_number', 'national_id', 'full_name',
+        'phone_number', 'email'
     ]
-    ordering = ['-registration_date']
+    list_select_related = ['user', 'assigned_loan_officer', 'created_by']
+    select_related_fields = list_select_related
+    ordering = ['-registration_date', '-id']
+    paginator = FasterAdminPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Basic Information', {
@@ -130,7 +244,8 @@ class MemberAdmin(admin.ModelAdmin):
         }),
         ('SACCO Information', {
             'fields': (
-                'status', 'assigned_loan_officer', 'created_by'
+                'status', 'assigned_loan_officer', 'created_by',
+                'get_activity_link'
             )
         }),
         ('Timestamps', {
@@ -141,27 +256,39 @@ class MemberAdmin(admin.ModelAdmin):
     
     readonly_fields = [
         'member_number', 'registration_date', 'created_at', 
-        'updated_at', 'get_photo_thumbnail'
+        'updated_at', 'get_photo_thumbnail', 'get_activity_link'
     ]
+    autocomplete_fields = ['user', 'assigned_loan_officer', 'created_by']
     
     inlines = [NextOfKinInline, GuarantorInline, MemberDocumentInline, MemberActivityInline]
     
     actions = ['activate_members', 'deactivate_members', 'assign_loan_officer']
     
     def get_full_name(self, obj):
-        return obj.get_full_name()
+        return obj.full_name
     get_full_name.short_description = 'Full Name'
-    get_full_name.admin_order_field = 'first_name'
+    get_full_name.admin_order_field = 'full_name'
     
     def get_photo_thumbnail(self, obj):
-        if obj.photo:
-            return format_html(
-                '<img src="{}" width="50" height="50" style="border-radius: 50%;" />',
-                obj.photo.url
-            )
+        name = obj.photo.name
+        if name:
+            # Photos live on the default filesystem storage, so build the URL
+            # directly rather than asking the storage backend for every row
+            url = f"{settings.MEDIA_URL}{filepath_to_uri(name)}"
+            return mark_safe(_THUMBNAIL_TEMPLATE.format(url=escape(url)))
         return "No Photo"
     get_photo_thumbnail.short_description = 'Photo'
     
+    def get_activity_link(self, obj):
+        if obj.pk:
+            url = reverse('admin:members_memberactivity_changelist')
+            return format_html(
+                '<a href="{}?member__id__exact={}">View all activities</a>',
+                url, obj.pk
+            )
+        return "-"
+    get_activity_link.short_description = 'Activity History'
+    
     def activate_members(self, request, queryset):
         updated = queryset.update(status='active')
         self.message_user(request, f'{updated} members activated successfully.')
@@ -176,15 +303,10 @@ class MemberAdmin(admin.ModelAdmin):
         # This would open a form to select loan officer
         pass
     assign_loan_officer.short_description = "Assign loan officer to selected members"
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'user', 'assigned_loan_officer', 'created_by'
-        )
 
 
 @admin.register(NextOfKin)
-class NextOfKinAdmin(admin.ModelAdmin):
+class NextOfKinAdmin(ListOnlyFieldsMixin, OptimizedModelAdmin):
     """Next of Kin admin interface"""
     
     list_display = [
@@ -192,15 +314,18 @@ class NextOfKinAdmin(admin.ModelAdmin):
         'phone_number', 'is_primary'
     ]
     list_filter = ['relationship', 'is_primary']
-    search_fields = ['full_name', 'member__first_name', 'member__last_name', 'phone_number']
+    search_fields = ['full_name', 'member__full_name', 'phone_number']
+    list_select_related = ['member']
+    select_related_fields = list_select_related
+    list_only_fields = [
+        'full_name', 'relationship', 'phone_number', 'is_primary',
+        'member__member_number', 'member__full_name',
+    ]
     ordering = ['member', '-is_primary', 'full_name']
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related('member')
 
 
 @admin.register(Guarantor)
-class GuarantorAdmin(admin.ModelAdmin):
+class GuarantorAdmin(ListOnlyFieldsMixin, OptimizedModelAdmin):
     """Guarantor admin interface"""
     
     list_display = [
@@ -209,9 +334,15 @@ class GuarantorAdmin(admin.ModelAdmin):
     ]
     list_filter = ['status', 'collateral_type', 'created_at']
     search_fields = [
-        'full_name', 'guarantor_member__first_name', 
-        'guarantor_member__last_name', 'member__first_name', 
-        'member__last_name', 'collateral_type'
+        'full_name', 'guarantor_member__full_name',
+        'member__full_name', 'collateral_type'
+    ]
+    list_select_related = ['member', 'guarantor_member']
+    select_related_fields = list_select_related
+    list_only_fields = [
+        'full_name', 'collateral_type', 'collateral_value', 'status', 'created_at',
+        'member__member_number', 'member__full_name',
+        'guarantor_member__full_name',
     ]
     ordering = ['-created_at']
     
@@ -241,63 +372,74 @@ class GuarantorAdmin(admin.ModelAdmin):
     )
     
     readonly_fields = ['created_at', 'updated_at']
+    autocomplete_fields = ['member', 'guarantor_member']
     
     def get_guarantor_name(self, obj):
         if obj.guarantor_member:
-            return obj.guarantor_member.get_full_name()
+            return obj.guarantor_member.full_name
         return obj.full_name or "Unknown"
     get_guarantor_name.short_description = 'Guarantor Name'
-    
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'member', 'guarantor_member'
-        )
 
 
 @admin.register(MemberDocument)
-class MemberDocumentAdmin(admin.ModelAdmin):
+class MemberDocumentAdmin(ListOnlyFieldsMixin, OptimizedModelAdmin):
     """Member Document admin interface"""
     
     list_display = [
-        'title', 'member', 'document_type', 
+        'title', 'get_member_name', 'document_type', 
         'uploaded_by', 'uploaded_at'
     ]
     list_filter = ['document_type', 'uploaded_at']
     search_fields = [
-        'title', 'member__first_name', 'member__last_name',
-        'member__member_number'
+        'title', 'member__full_name', 'member__member_number'
+    ]
+    list_select_related = ['member', 'uploaded_by']
+    select_related_fields = list_select_related
+    list_only_fields = [
+        'title', 'document_type', 'uploaded_at', 'member__full_name',
+        'uploaded_by__username', 'uploaded_by__role',
     ]
     ordering = ['-uploaded_at']
+    paginator = FasterAdminPaginator
+    show_full_result_count = False
     
     readonly_fields = ['uploaded_at']
     
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'member', 'uploaded_by'
-        )
+    def get_member_name(self, obj):
+        return obj.member.full_name
+    get_member_name.short_description = 'Member'
+    get_member_name.admin_order_field = 'member__full_name'
 
 
 @admin.register(MemberActivity)
-class MemberActivityAdmin(admin.ModelAdmin):
+class MemberActivityAdmin(ListOnlyFieldsMixin, OptimizedModelAdmin):
     """Member Activity admin interface"""
     
     list_display = [
-        'title', 'member', 'activity_type', 
+        'title', 'get_member_name', 'activity_type', 
         'created_by', 'created_at'
     ]
     list_filter = ['activity_type', 'created_at']
     search_fields = [
-        'title', 'description', 'member__first_name', 
-        'member__last_name', 'member__member_number'
+        'title', 'description', 'member__full_name',
+        'member__member_number'
+    ]
+    list_select_related = ['member', 'created_by']
+    select_related_fields = list_select_related
+    list_only_fields = [
+        'title', 'activity_type', 'created_at', 'member__full_name',
+        'created_by__username', 'created_by__role',
     ]
     ordering = ['-created_at']
+    paginator = FasterAdminPaginator
+    show_full_result_count = False
     
     readonly_fields = ['created_at']
     
-    def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'member', 'created_by'
-        )
+    def get_member_name(self, obj):
+        return obj.member.full_name
+    get_member_name.short_description = 'Member'
+    get_member_name.admin_order_field = 'member__full_name'
 
 
 # Customize admin site headers
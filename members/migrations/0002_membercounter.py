@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-15 09:57
+
+from django.db import migrations, models
+
+
+def seed_counter(apps, schema_editor):
+    """Start the counter after the highest member number already issued"""
+    MemberCounter = apps.get_model('members', 'MemberCounter')
+    Member = apps.get_model('members', 'Member')
+    last_value = 0
+    for number in Member.objects.values_list('member_number', flat=True).iterator():
+        last_value = max(last_value, int(number.split('-')[-1]))
+    MemberCounter.objects.create(pk=1, last_value=last_value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Member Counter',
+                'verbose_name_plural': 'Member Counters',
+            },
+        ),
+        migrations.RunPython(seed_counter, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.7 on 2026-10-15 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_membercounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='guarantor',
+            index=models.Index(fields=['-created_at', 'status'], name='members_gua_created_b360f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['-registration_date'], name='members_mem_registr_b3227d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['status'], name='members_mem_status_734de0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['assigned_loan_officer', 'status'], name='members_mem_assigne_ab0a68_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['county'], name='members_mem_county_6caf78_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberactivity',
+            index=models.Index(fields=['-created_at'], name='members_mem_created_a5818d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberactivity',
+            index=models.Index(fields=['member', '-created_at'], name='members_mem_member__4d1b5b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberactivity',
+            index=models.Index(fields=['activity_type'], name='members_mem_activit_eb61f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberdocument',
+            index=models.Index(fields=['-uploaded_at'], name='members_mem_uploade_b296dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memberdocument',
+            index=models.Index(fields=['document_type'], name='members_mem_documen_9f1efe_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0003_member_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='member',
+            name='members_mem_registr_b3227d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['-registration_date', '-id'], name='members_mem_registr_f382bd_idx'),
+        ),
+    ]
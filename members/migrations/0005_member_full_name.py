@@ -0,0 +1,36 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:07
+
+from django.db import migrations, models
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Concat
+
+
+def backfill_full_name(apps, schema_editor):
+    """Compose full_name for existing members in one UPDATE"""
+    Member = apps.get_model('members', 'Member')
+    Member.objects.update(full_name=Case(
+        When(
+            Q(middle_name__isnull=True) | Q(middle_name=''),
+            then=Concat('first_name', Value(' '), 'last_name')
+        ),
+        default=Concat(
+            'first_name', Value(' '), 'middle_name', Value(' '), 'last_name'
+        ),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_member_registration_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='full_name',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=160),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_full_name, migrations.RunPython.noop),
+    ]
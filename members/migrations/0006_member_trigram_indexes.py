@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# Trigram GIN indexes let PostgreSQL answer the admin's icontains
+# (ILIKE '%term%') searches from an index instead of a sequential scan
+TRIGRAM_INDEXES = [
+    ('member_full_name_trgm', 'full_name'),
+    ('member_number_trgm', 'member_number'),
+    ('member_phone_number_trgm', 'phone_number'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON members_member '
+            f'USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_member_full_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, connection, transaction, IntegrityError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from phonenumber_field.modelfields import PhoneNumberField
 from PIL import Image
@@ -15,6 +15,7 @@ class User(AbstractUser):
         ('loan_officer', 'Loan Officer'),
         ('member', 'Member'),
     ]
+    ROLE_DISPLAY = dict(ROLE_CHOICES)
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='member')
     phone_number = PhoneNumberField(blank=True, null=True)
@@ -24,7 +25,7 @@ class User(AbstractUser):
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.username} ({self.get_role_display()})"
+        return f"{self.username} ({self.ROLE_DISPLAY.get(self.role, self.role)})"
     
     @property
     def is_admin(self):
@@ -43,6 +44,63 @@ class User(AbstractUser):
         return self.role == 'member'
 
 
+class MemberCounter(models.Model):
+    """Counter used to mint member numbers"""
+    
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Member Counter'
+        verbose_name_plural = 'Member Counters'
+    
+    def __str__(self):
+        return f"Member numbers: {self.last_value}"
+    
+    @classmethod
+    def reserve(cls, n=1):
+        """Reserve the next n member numbers and return them as a range
+        
+        The counter is bumped and read back by a single UPDATE ... RETURNING,
+        so concurrent registrations can never be handed the same number.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_value = last_value + %s "
+                f"WHERE id = 1 RETURNING last_value",
+                [n]
+            )
+            row = cursor.fetchone()
+        if row is None:
+            cls.objects.get_or_create(pk=1)
+            return cls.reserve(n)
+        return range(row[0] - n + 1, row[0] + 1)
+
+
+class MemberManager(models.Manager):
+    """Manager for members, which carry a sequential member number"""
+    
+    def assign_numbers(self, objs):
+        """Give every unnumbered member the next number from the counter"""
+        pending = [obj for obj in objs if not obj.member_number]
+        if not pending:
+            return
+        values = MemberCounter.reserve(len(pending))
+        for obj, value in zip(pending, values):
+            obj.member_number = Member.format_number(value)
+    
+    def bulk_create_with_numbers(self, objs, batch_size=1000, **kwargs):
+        """Reserve numbers for the whole import up front, then bulk insert
+        
+        bulk_create() skips save(), so photos are not resized here.
+        """
+        objs = list(objs)
+        self.assign_numbers(objs)
+        for obj in objs:
+            obj.set_full_name()
+        return self.bulk_create(objs, batch_size=batch_size, **kwargs)
+
+
 class Member(models.Model):
     """Member profile with comprehensive information"""
     
@@ -74,6 +132,8 @@ class Member(models.Model):
     first_name = models.CharField(max_length=50)
     middle_name = models.CharField(max_length=50, blank=True, null=True)
     last_name = models.CharField(max_length=50)
+    # Denormalized from the name parts on save, for display and search
+    full_name = models.CharField(max_length=160, db_index=True, editable=False)
     date_of_birth = models.DateField()
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES)
     marital_status = models.CharField(max_length=20, choices=MARITAL_STATUS_CHOICES)
@@ -122,40 +182,99 @@ class Member(models.Model):
         related_name='created_members'
     )
     
+    objects = MemberManager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Member'
         verbose_name_plural = 'Members'
+        indexes = [
+            models.Index(fields=['-registration_date', '-id']),
+            models.Index(fields=['status']),
+            models.Index(fields=['assigned_loan_officer', 'status']),
+            models.Index(fields=['county']),
+        ]
     
     def __str__(self):
-        return f"{self.member_number} - {self.get_full_name()}"
+        return f"{self.member_number} - {self.full_name}"
     
     def get_full_name(self):
-        names = [self.first_name]
-        if self.middle_name:
-            names.append(self.middle_name)
-        names.append(self.last_name)
-        return ' '.join(names)
+        return self.full_name
+    
+    def set_full_name(self):
+        middle = f"{self.middle_name} " if self.middle_name else ""
+        self.full_name = f"{self.first_name} {middle}{self.last_name}"
+    
+    @staticmethod
+    def format_number(value):
+        return f"MEM-{str(value).zfill(6)}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored photo so saves can tell whether it changed
+        instance._original_photo = instance.__dict__.get('photo')
+        return instance
     
     def save(self, *args, **kwargs):
+        # Keep the denormalized name in step with its parts
+        name_fields = {'first_name', 'middle_name', 'last_name'}
+        if not name_fields & self.get_deferred_fields():
+            self.set_full_name()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and name_fields & set(update_fields):
+                kwargs['update_fields'] = {*update_fields, 'full_name'}
+        
         # Generate member number if not provided
-        if not self.member_number:
-            last_member = Member.objects.order_by('-id').first()
-            if last_member:
-                last_number = int(last_member.member_number.split('-')[-1])
-                self.member_number = f"MEM-{str(last_number + 1).zfill(6)}"
-            else:
-                self.member_number = "MEM-000001"
+        if self.member_number:
+            super().save(*args, **kwargs)
+        else:
+            self._save_with_new_number(*args, **kwargs)
         
-        super().save(*args, **kwargs)
+        # Resize image if a new one was uploaded, once the row is committed
+        update_fields = kwargs.get('update_fields')
+        if 'photo' in self.__dict__ and (update_fields is None or 'photo' in update_fields):
+            if self.photo and self.photo.name != getattr(self, '_original_photo', None):
+                transaction.on_commit(self.resize_photo)
+            self._original_photo = self.photo.name
+    
+    def _save_with_new_number(self, *args, **kwargs):
+        """Save with the next counter number, skipping numbers already taken
         
-        # Resize image if uploaded
-        if self.photo:
-            img = Image.open(self.photo.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.photo.path)
+        Numbers entered by hand or imported can run ahead of the counter; the
+        unique index catches the clash and the save is retried a few times.
+        """
+        for attempt in range(3):
+            Member.objects.assign_numbers([self])
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                taken = Member.objects.filter(member_number=self.member_number).exists()
+                self.member_number = ''
+                if not taken or attempt == 2:
+                    raise
+    
+    # Image modes Image.reduce() accepts
+    REDUCIBLE_PHOTO_MODES = frozenset(['RGB', 'RGBA', 'L', 'LA', 'CMYK', 'YCbCr'])
+    
+    def resize_photo(self):
+        output_size = (300, 300)
+        img = Image.open(self.photo.path)
+        if img.height > 300 or img.width > 300:
+            # Let libjpeg scale while decoding, then shrink by whole factors
+            # before the final resample; draft() is a no-op for other formats
+            img.draft('RGB', output_size)
+            # reduce() rejects palette and 1-bit images, which thumbnail()
+            # resizes alone; any other mode, such as 16-bit greyscale, which
+            # neither can resample, is converted to RGB first
+            if img.mode not in self.REDUCIBLE_PHOTO_MODES | {'1', 'P'}:
+                img = img.convert('RGB')
+            factor = max(img.size) // 300
+            if factor > 1 and img.mode in self.REDUCIBLE_PHOTO_MODES:
+                img = img.reduce(factor)
+            img.thumbnail(output_size, Image.Resampling.LANCZOS)
+            img.save(self.photo.path, optimize=True, progressive=True)
 
 
 class NextOfKin(models.Model):
@@ -186,7 +305,7 @@ class NextOfKin(models.Model):
         verbose_name_plural = 'Next of Kin'
     
     def __str__(self):
-        return f"{self.full_name} - {self.member.get_full_name()}"
+        return f"{self.full_name} - {self.member.full_name}"
 
 
 class Guarantor(models.Model):
@@ -229,11 +348,14 @@ class Guarantor(models.Model):
     class Meta:
         verbose_name = 'Guarantor'
         verbose_name_plural = 'Guarantors'
+        indexes = [
+            models.Index(fields=['-created_at', 'status']),
+        ]
     
     def __str__(self):
         if self.guarantor_member:
-            return f"{self.guarantor_member.get_full_name()} guarantees {self.member.get_full_name()}"
-        return f"{self.full_name} guarantees {self.member.get_full_name()}"
+            return f"{self.guarantor_member.full_name} guarantees {self.member.full_name}"
+        return f"{self.full_name} guarantees {self.member.full_name}"
 
 
 class MemberDocument(models.Model):
@@ -261,9 +383,13 @@ class MemberDocument(models.Model):
     class Meta:
         verbose_name = 'Member Document'
         verbose_name_plural = 'Member Documents'
+        indexes = [
+            models.Index(fields=['-uploaded_at']),
+            models.Index(fields=['document_type']),
+        ]
     
     def __str__(self):
-        return f"{self.title} - {self.member.get_full_name()}"
+        return f"{self.title} - {self.member.full_name}"
 
 
 class MemberActivity(models.Model):
@@ -293,6 +419,11 @@ class MemberActivity(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Member Activity'
         verbose_name_plural = 'Member Activities'
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['member', '-created_at']),
+            models.Index(fields=['activity_type']),
+        ]
     
     def __str__(self):
-        return f"{self.title} - {self.member.get_full_name()}"
+        return f"{self.title} - {self.member.full_name}"
@@ -1,3 +1,87 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .models import Member, User
+
+
+def make_member(number=0, **kwargs):
+    user = User.objects.create(username=f'member{number}')
+    return Member.objects.create(
+        user=user, national_id=f'ID{number}', first_name='Jane', last_name=f'Doe{number}',
+        date_of_birth=date(1990, 1, 1), gender='F', marital_status='single',
+        phone_number='+254712345678', county='Nairobi', sub_county='Westlands',
+        ward='Parklands', village='Highridge', occupation='Trader', monthly_income=1000,
+        **kwargs
+    )
+
+
+class MemberPhotoTests(TestCase):
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        self.member = make_member()
+    
+    def save_photo(self, mode, format):
+        buffer = io.BytesIO()
+        Image.new(mode, (900, 600)).save(buffer, format=format)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.photo.save(f'photo.{format.lower()}', ContentFile(buffer.getvalue()))
+        with Image.open(self.member.photo.path) as img:
+            return img.size, img.mode
+    
+    def test_rgb_photo_is_shrunk_to_fit(self):
+        self.assertEqual(self.save_photo('RGB', 'JPEG'), ((300, 200), 'RGB'))
+    
+    def test_modes_reduce_rejects_are_still_shrunk(self):
+        for mode, saved_mode in [('P', 'P'), ('1', '1'), ('I;16', 'RGB')]:
+            with self.subTest(mode=mode):
+                self.assertEqual(self.save_photo(mode, 'PNG'), ((300, 200), saved_mode))
+    
+    def test_small_photo_is_left_alone(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (200, 100)).save(buffer, format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.photo.save('photo.png', ContentFile(buffer.getvalue()))
+        with Image.open(self.member.photo.path) as img:
+            self.assertEqual(img.size, (200, 100))
+
+
+class MemberNumberTests(TestCase):
+    
+    def test_numbers_are_minted_in_sequence(self):
+        self.assertEqual(
+            [make_member(n).member_number for n in range(2)],
+            [Member.format_number(1), Member.format_number(2)]
+        )
+    
+    def test_number_taken_by_hand_is_skipped(self):
+        make_member(1)
+        make_member(2, member_number=Member.format_number(2))
+        self.assertEqual(make_member(3).member_number, Member.format_number(3))
+        self.assertEqual(make_member(4).member_number, Member.format_number(4))
+    
+    def test_bulk_import_reserves_a_block(self):
+        make_member(1)
+        users = [User.objects.create(username=f'import{n}') for n in range(3)]
+        members = Member.objects.bulk_create_with_numbers([
+            Member(
+                user=user, national_id=f'IMP{n}', first_name='Imported', last_name=str(n),
+                date_of_birth=date(1990, 1, 1), gender='M', marital_status='single',
+                phone_number='+254712345678', county='c', sub_county='s', ward='w',
+                village='v', occupation='o', monthly_income=1000
+            )
+            for n, user in enumerate(users)
+        ])
+        self.assertEqual(
+            [member.member_number for member in members],
+            [Member.format_number(n) for n in (2, 3, 4)]
+        )
+        self.assertEqual(members[0].full_name, 'Imported 0')
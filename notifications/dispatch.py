@@ -0,0 +1,91 @@
+"""Enqueueing and claiming of notifications for delivery
+
+All writes to NotificationQueue go through enqueue() and claim(), so the
+queue can be moved to a message broker without touching callers.
+"""
+from datetime import timedelta
+
+from django.core import mail
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationQueue
+
+
+# Queue priority per Notification.priority; lower numbers are sent first
+PRIORITIES = {
+    'urgent': 1,
+    'high': 3,
+    'normal': 5,
+    'low': 7,
+}
+
+
+def enqueue(notification, priority=None, delay_minutes=0):
+    """Queue notification for delivery after delay_minutes"""
+    if priority is None:
+        priority = PRIORITIES.get(notification.priority, 5)
+    return NotificationQueue.objects.create(
+        notification=notification,
+        priority=priority,
+        scheduled_for=timezone.now() + timedelta(minutes=delay_minutes),
+    )
+
+
+def claim(limit=100):
+    """Mark up to limit due entries as processing and return their ids
+    
+    On PostgreSQL the rows are locked with SKIP LOCKED, so concurrent
+    workers each claim a different batch instead of queueing on the same
+    rows; on SQLite the surrounding transaction serializes claims.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            NotificationQueue.objects.filter(
+                status__in=['pending', 'retrying'],
+                scheduled_for__lte=now
+            ).order_by('priority', 'scheduled_for')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        NotificationQueue.objects.filter(pk__in=ids).update(
+            status='processing', started_at=now, updated_at=now
+        )
+    return ids
+
+
+def send_email_batch(notifications):
+    """Send notifications as emails over one connection, then mark them sent
+    
+    Notifications without an email address are marked failed.
+    """
+    now = timezone.now()
+    undeliverable = [n.pk for n in notifications if not n.email_address]
+    if undeliverable:
+        Notification.objects.filter(pk__in=undeliverable).update(
+            status='failed', error_message='No email address', updated_at=now
+        )
+    notifications = [n for n in notifications if n.email_address]
+    if not notifications:
+        return 0
+    with mail.get_connection() as connection:
+        messages = []
+        for notification in notifications:
+            message = mail.EmailMultiAlternatives(
+                notification.subject, notification.message,
+                to=[notification.email_address], connection=connection
+            )
+            if notification.html_message:
+                message.attach_alternative(notification.html_message, 'text/html')
+            messages.append(message)
+        connection.send_messages(messages)
+    return Notification.objects.filter(pk__in=[n.pk for n in notifications]).update(
+        status='sent', sent_at=now, updated_at=now
+    )
+
+
+def send_pending_email(limit=100):
+    """Send up to limit due email notifications in one batch"""
+    with transaction.atomic():
+        return send_email_batch(Notification.objects.batch_pending('email', limit))
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notifications.models import NotificationLog
+
+
+class Command(BaseCommand):
+    help = 'Delete notification log entries older than the retention period'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SACCO_SETTINGS['NOTIFICATION_LOG_RETENTION_DAYS'],
+            help='Keep entries logged within this many days'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Rows deleted per transaction'
+        )
+    
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = NotificationLog.objects.purge(before, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} notification log entries'))
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('members', '0006_member_trigram_indexes'),
+        ('notifications', '0001_initial'),
+        ('repayments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient_user', 'read_at'], name='notificatio_recipie_252835_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient_member', '-created_at'], name='notificatio_recipie_7db1e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['status', 'scheduled_at'], name='notificatio_status_a9c93f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['notification', '-timestamp'], name='notificatio_notific_c75595_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationqueue',
+            index=models.Index(fields=['status', 'priority', 'scheduled_for'], name='notificatio_status_7c60d2_idx'),
+        ),
+    ]
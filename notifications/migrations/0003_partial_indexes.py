@@ -0,0 +1,30 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('members', '0006_member_trigram_indexes'),
+        ('notifications', '0002_notification_indexes'),
+        ('repayments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notificationqueue',
+            name='notificatio_status_7c60d2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('status', 'scheduled')), fields=['scheduled_at'], name='notif_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationqueue',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'retrying'])), fields=['priority', 'scheduled_for'], name='nq_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationtemplate',
+            name='compiled_cache',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
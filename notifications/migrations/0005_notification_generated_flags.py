@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('members', '0006_member_trigram_indexes'),
+        ('notifications', '0004_template_compiled_cache'),
+        ('repayments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='is_delivered',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('status', 'delivered')), output_field=models.BooleanField()),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='is_read',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('read_at__isnull', False)), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('read_at__isnull', True)), fields=['recipient_user'], name='notif_unread_idx'),
+        ),
+    ]
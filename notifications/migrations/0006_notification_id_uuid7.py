@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:15
+
+import notifications.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_generated_flags'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_id',
+            field=models.UUIDField(default=notifications.models.uuid7, editable=False, unique=True),
+        ),
+    ]
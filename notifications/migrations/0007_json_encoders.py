@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:16
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_id_uuid7'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='context_data',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notificationlog',
+            name='details',
+            field=models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True),
+        ),
+    ]
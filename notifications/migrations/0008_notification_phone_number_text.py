@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:17
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_json_encoders'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='phone_number',
+            field=models.CharField(blank=True, max_length=20, null=True, validators=[django.core.validators.RegexValidator('^\\+?\\d{7,15}$', 'Enter a phone number in E.164 format.')]),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:19
+
+import re
+
+from django.db import migrations, models
+
+VARIABLE_NAME = re.compile(r'{{\s*(\w+)')
+PARTS = ['sms_message', 'sms_subject', 'email_message', 'email_subject', 'email_html']
+
+
+def fill_variables(apps, schema_editor):
+    NotificationTemplate = apps.get_model('notifications', 'NotificationTemplate')
+    for template in NotificationTemplate.objects.only('id', *PARTS):
+        template.variables = list(dict.fromkeys(
+            name
+            for part in PARTS
+            for name in VARIABLE_NAME.findall(getattr(template, part) or '')
+        ))
+        template.save(update_fields=['variables'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_notification_phone_number_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationtemplate',
+            name='variables',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.RunPython(fill_variables, migrations.RunPython.noop),
+    ]
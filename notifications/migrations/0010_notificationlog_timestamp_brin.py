@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+# NotificationLog is append-only, so timestamp follows the physical row
+# order and a BRIN index answers time-range scans from a few pages
+def create_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS notif_log_ts_brin ON notifications_notificationlog '
+        'USING brin (timestamp)'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS notif_log_ts_brin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0009_template_variables'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('members', '0006_member_trigram_indexes'),
+        ('notifications', '0010_notificationlog_timestamp_brin'),
+        ('repayments', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='related_application',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='loans.loanapplication'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='related_loan',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='loans.loan'),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='related_transaction',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications', to='repayments.repaymenttransaction'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('related_loan__isnull', False)), fields=['related_loan'], name='notif_related_loan_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('related_application__isnull', False)), fields=['related_application'], name='notif_related_app_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('related_transaction__isnull', False)), fields=['related_transaction'], name='notif_related_txn_idx'),
+        ),
+    ]
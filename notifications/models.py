@@ -1,10 +1,75 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
-from django.core.validators import MinValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MinValueValidator, RegexValidator
+from django.template import Context, Template
+from django.template.base import render_value_in_context
 from django.utils import timezone
-from phonenumber_field.modelfields import PhoneNumberField
+from contextlib import contextmanager
+from functools import cached_property, lru_cache
+import os
+import re
+import threading
+import time
 import uuid
 
+_SIMPLE_VARIABLE = re.compile(r'{{\s*(\w+)\s*}}')
+# Leading name of any {{ ... }} expression, including filtered ones
+_VARIABLE_NAME = re.compile(r'{{\s*(\w+)')
+
+# Log entries held by NotificationLog.objects.buffered(), per thread
+_log_buffer = threading.local()
+
+# (provider, loaded at) returned by SMSProvider.get_active(); see there
+_active_sms_provider = None
+
+
+def uuid7():
+    """Return a time-ordered UUID (RFC 9562 version 7)
+    
+    The leading 48 bits are the Unix time in milliseconds, so new keys sort
+    after old ones and index inserts land at the right edge of the B-tree.
+    """
+    value = (time.time_ns() // 1_000_000) << 80
+    value |= int.from_bytes(os.urandom(10), 'big')
+    value &= ~(0xF << 76)
+    value |= 0x7 << 76
+    value &= ~(0x3 << 62)
+    value |= 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+@lru_cache(maxsize=512)
+def _compile(template_pk, updated_ts, part, body):
+    """Compile a template body once per template version and part
+    
+    updated_at moves on every save, so an edited template gets a new key.
+    """
+    return Template(body)
+
+
+def _split(body):
+    """Split a template body into ['lit', text] and ['var', name] segments
+    
+    Returns None when the body uses tags, filters or attribute lookups,
+    which only the template engine can render.
+    """
+    segments = []
+    pos = 0
+    for match in _SIMPLE_VARIABLE.finditer(body or ''):
+        if match.start() > pos:
+            segments.append(['lit', body[pos:match.start()]])
+        segments.append(['var', match.group(1)])
+        pos = match.end()
+    if body and pos < len(body):
+        segments.append(['lit', body[pos:]])
+    for kind, value in segments:
+        if kind == 'lit' and ('{{' in value or '{%' in value or '{#' in value):
+            return None
+    return segments
+
 
 class NotificationTemplate(models.Model):
     """Templates for different types of notifications"""
@@ -32,6 +97,15 @@ class NotificationTemplate(models.Model):
         ('both', 'SMS and Email'),
     ]
     
+    # Template parts by render channel; only HTML output is autoescaped
+    RENDER_PARTS = {
+        'sms': 'sms_message',
+        'sms_subject': 'sms_subject',
+        'email': 'email_message',
+        'email_subject': 'email_subject',
+        'email_html': 'email_html',
+    }
+    
     name = models.CharField(max_length=100, unique=True)
     template_type = models.CharField(max_length=30, choices=TEMPLATE_TYPES)
     channel = models.CharField(max_length=10, choices=NOTIFICATION_CHANNELS)
@@ -45,6 +119,11 @@ class NotificationTemplate(models.Model):
     email_message = models.TextField(blank=True, null=True, help_text="Email message template. Use {{variable}} for dynamic content.")
     email_html = models.TextField(blank=True, null=True, help_text="HTML version of email template.")
     
+    # Pre-split plain-text bodies, see render_fast()
+    compiled_cache = models.JSONField(blank=True, null=True, editable=False)
+    # Context variables used by any part, worked out on save
+    variables = models.JSONField(default=list, editable=False)
+    
     # Settings
     is_active = models.BooleanField(default=True)
     is_system_template = models.BooleanField(default=False)  # System templates cannot be deleted
@@ -65,6 +144,188 @@ class NotificationTemplate(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.get_channel_display()})"
+    
+    def render(self, channel, context):
+        """Render the template part for channel with a context dict"""
+        part = self.RENDER_PARTS[channel]
+        body = getattr(self, part) or ''
+        compiled = _compile(self.pk, self.updated_at.timestamp(), part, body)
+        return compiled.render(Context(context, autoescape=channel == 'email_html'))
+    
+    def render_fast(self, channel, context):
+        """Render the SMS or plain-text email body by joining its cached segments
+        
+        Bodies that need the template engine fall back to render().
+        """
+        segments = (self.compiled_cache or {}).get(channel)
+        if segments is None:
+            return self.render(channel, context)
+        # Values are formatted as the engine would, localized and in local time
+        render_context = Context(autoescape=False)
+        return ''.join(
+            value if kind == 'lit' else render_value_in_context(context.get(value, ''), render_context)
+            for kind, value in segments
+        )
+    
+    def missing_variables(self, context):
+        """Return the template variables that context does not supply"""
+        return [name for name in self.variables if name not in context]
+    
+    def save(self, *args, **kwargs):
+        self.compiled_cache = {
+            'sms': _split(self.sms_message),
+            'email': _split(self.email_message),
+        }
+        self.variables = list(dict.fromkeys(
+            name
+            for part in self.RENDER_PARTS.values()
+            for name in _VARIABLE_NAME.findall(getattr(self, part) or '')
+        ))
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(self.RENDER_PARTS.values()) & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'compiled_cache', 'variables'}
+        super().save(*args, **kwargs)
+
+
+class NotificationManager(models.Manager):
+    """Manager for individual notifications
+    
+    Recipients, template and related records are joined in by default, as
+    nearly every listing of notifications shows them.
+    """
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            'recipient_user', 'recipient_member', 'template',
+            'related_loan', 'related_application', 'related_transaction'
+        )
+    
+    def dispatch_view(self):
+        """Notifications with only the columns status and scheduling code reads"""
+        return self.select_related(None).only(
+            'id', 'status', 'channel', 'scheduled_at', 'priority'
+        )
+    
+    def light_list(self):
+        """Notifications without the large HTML and JSON columns"""
+        return self.defer('html_message', 'delivery_report', 'context_data')
+    
+    def purge_unlinked(self, before, chunk_size=10000):
+        """Delete notifications created before the given datetime that no
+        longer point at a loan, application or transaction
+        
+        Rows are deleted chunk_size at a time, each chunk in its own
+        transaction, along with their logs and queue entries.
+        """
+        deleted = 0
+        while True:
+            ids = list(
+                self.filter(
+                    created_at__lt=before,
+                    related_loan__isnull=True,
+                    related_application__isnull=True,
+                    related_transaction__isnull=True
+                ).order_by('created_at').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return deleted
+            deleted += self.filter(pk__in=ids).delete()[1].get(self.model._meta.label, 0)
+    
+    def batch_pending(self, channel, limit=100):
+        """Lock and return up to limit due scheduled notifications for channel
+        
+        Must run inside a transaction; rows locked by another worker are
+        skipped. Related rows are not joined, as FOR UPDATE cannot lock the
+        nullable side of an outer join.
+        """
+        return list(
+            self.select_related(None).filter(
+                channel=channel,
+                status='scheduled',
+                scheduled_at__lte=timezone.now()
+            ).defer('delivery_report', 'context_data')
+            .order_by('scheduled_at').select_for_update(skip_locked=True)[:limit]
+        )
+    
+    def create_for_bulk(self, bulk, recipients):
+        """Create the notifications of a bulk campaign for recipients
+        
+        Recipients may be Members or Users. One notification is made per
+        channel the recipient has not switched off in their preferences,
+        rendered in-process from the campaign content and inserted in
+        batches; the campaign's total_recipients is then raised by the
+        number of recipients reached with a single UPDATE, so a campaign can
+        be created in several calls.
+        """
+        channel = bulk.template.channel
+        channels = ['sms', 'email'] if channel == 'both' else [channel]
+        subject = Template(bulk.subject)
+        message = Template(bulk.message)
+        html_message = Template(bulk.html_message) if bulk.html_message else None
+        scheduled_at = bulk.scheduled_at or timezone.now()
+        company_name = settings.SACCO_SETTINGS['COMPANY_NAME']
+        
+        recipients = list(recipients)
+        preferences = NotificationPreference.objects.for_users({
+            recipient.user_id if recipient._meta.model_name == 'member' else recipient.pk
+            for recipient in recipients
+        })
+        
+        objs = []
+        recipient_count = 0
+        for recipient in recipients:
+            if recipient._meta.model_name == 'member':
+                member, user_id = recipient, recipient.user_id
+                name = recipient.full_name
+            else:
+                member, user_id = None, recipient.pk
+                name = recipient.get_full_name() or recipient.username
+            preference = preferences[user_id]
+            wanted = [c for c in channels if getattr(preference, f'{c}_enabled')]
+            if not wanted:
+                continue
+            recipient_count += 1
+            # Members and Users both carry phone_number and email
+            phone_number, email_address = recipient.phone_number, recipient.email
+            phone_number = phone_number.as_e164 if phone_number else None
+            
+            context_data = {
+                'name': name,
+                'member_number': member.member_number if member else '',
+                'company_name': company_name,
+            }
+            # SMS and plain-text email must not be HTML-escaped
+            context = Context(context_data, autoescape=False)
+            rendered_subject = subject.render(context)
+            rendered_message = message.render(context)
+            rendered_html = html_message.render(Context(context_data)) if html_message else None
+            
+            for channel in wanted:
+                objs.append(self.model(
+                    recipient_user_id=user_id,
+                    recipient_member=member,
+                    notification_type='announcement',
+                    channel=channel,
+                    template_id=bulk.template_id,
+                    subject=rendered_subject,
+                    message=rendered_message,
+                    html_message=rendered_html if channel == 'email' else None,
+                    phone_number=phone_number if channel == 'sms' else None,
+                    email_address=email_address if channel == 'email' else None,
+                    status='scheduled',
+                    scheduled_at=scheduled_at,
+                    context_data=context_data,
+                    created_by_id=bulk.created_by_id,
+                ))
+        
+        with transaction.atomic():
+            created = self.bulk_create(
+                objs,
+                batch_size=settings.SACCO_SETTINGS['NOTIFICATION_BATCH_SIZE'],
+                ignore_conflicts=True
+            )
+            bulk.inc('total_recipients', recipient_count)
+        return created
 
 
 class Notification(models.Model):
@@ -102,7 +363,7 @@ class Notification(models.Model):
         ('urgent', 'Urgent'),
     ]
     
-    notification_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    notification_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     
     # Recipients
     recipient_user = models.ForeignKey(
@@ -136,7 +397,13 @@ class Notification(models.Model):
     html_message = models.TextField(blank=True, null=True)
     
     # Delivery Details
-    phone_number = PhoneNumberField(blank=True, null=True)
+    # E.164 text, formatted once when the notification is created
+    phone_number = models.CharField(
+        max_length=20,
+        blank=True,
+        null=True,
+        validators=[RegexValidator(r'^\+?\d{7,15}$', 'Enter a phone number in E.164 format.')]
+    )
     email_address = models.EmailField(blank=True, null=True)
     
     # Status and Scheduling
@@ -152,34 +419,50 @@ class Notification(models.Model):
     response_received = models.BooleanField(default=False)
     response_message = models.TextField(blank=True, null=True)
     
+    # Flags computed by the database so they can be filtered and indexed
+    is_read = models.GeneratedField(
+        expression=models.Q(read_at__isnull=False),
+        output_field=models.BooleanField(),
+        db_persist=True
+    )
+    is_delivered = models.GeneratedField(
+        expression=models.Q(status='delivered'),
+        output_field=models.BooleanField(),
+        db_persist=True
+    )
+    
     # External Service Details
     external_id = models.CharField(max_length=100, blank=True, null=True)  # ID from SMS/Email provider
     delivery_report = models.JSONField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
     
     # Context Data
-    context_data = models.JSONField(blank=True, null=True)  # Data used to render template
+    context_data = models.JSONField(encoder=DjangoJSONEncoder, blank=True, null=True)  # Data used to render template
     
-    # Related Objects
+    # Related Objects; kept when the record is deleted, and indexed only
+    # where set (see Meta.indexes)
     related_loan = models.ForeignKey(
         'loans.Loan',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_index=False,
         related_name='notifications'
     )
     related_application = models.ForeignKey(
         'loans.LoanApplication',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_index=False,
         related_name='notifications'
     )
     related_transaction = models.ForeignKey(
         'repayments.RepaymentTransaction',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        db_index=False,
         related_name='notifications'
     )
     
@@ -192,36 +475,70 @@ class Notification(models.Model):
         related_name='sent_notifications'
     )
     
+    objects = NotificationManager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
+        indexes = [
+            models.Index(fields=['recipient_user', 'read_at']),
+            models.Index(fields=['recipient_member', '-created_at']),
+            models.Index(fields=['status', 'scheduled_at']),
+            models.Index(
+                fields=['scheduled_at'],
+                condition=models.Q(status='scheduled'),
+                name='notif_scheduled_idx'
+            ),
+            models.Index(
+                fields=['recipient_user'],
+                condition=models.Q(read_at__isnull=True),
+                name='notif_unread_idx'
+            ),
+            models.Index(
+                fields=['related_loan'],
+                condition=models.Q(related_loan__isnull=False),
+                name='notif_related_loan_idx'
+            ),
+            models.Index(
+                fields=['related_application'],
+                condition=models.Q(related_application__isnull=False),
+                name='notif_related_app_idx'
+            ),
+            models.Index(
+                fields=['related_transaction'],
+                condition=models.Q(related_transaction__isnull=False),
+                name='notif_related_txn_idx'
+            ),
+        ]
     
     def __str__(self):
         recipient = self.recipient_member or self.recipient_user
         return f"{self.subject} - {recipient}"
     
-    @property
-    def is_read(self):
-        """Check if notification has been read"""
-        return self.read_at is not None
-    
-    @property
-    def is_delivered(self):
-        """Check if notification was delivered"""
-        return self.status == 'delivered'
-    
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.read_at:
             self.read_at = timezone.now()
             self.save(update_fields=['read_at'])
+            # The column is computed by the database; keep the instance in step
+            self.is_read = True
     
     def mark_as_clicked(self):
         """Mark notification as clicked"""
         if not self.clicked_at:
             self.clicked_at = timezone.now()
             self.save(update_fields=['clicked_at'])
+    
+    @classmethod
+    def bulk_mark_read(cls, ids):
+        """Mark every unread notification in ids as read with one UPDATE"""
+        return cls.objects.filter(pk__in=ids, read_at__isnull=True).update(read_at=timezone.now())
+    
+    @classmethod
+    def bulk_mark_clicked(cls, ids):
+        """Mark every unclicked notification in ids as clicked with one UPDATE"""
+        return cls.objects.filter(pk__in=ids, clicked_at__isnull=True).update(clicked_at=timezone.now())
 
 
 class BulkNotification(models.Model):
@@ -299,6 +616,71 @@ class BulkNotification(models.Model):
     
     def __str__(self):
         return f"{self.campaign_name} - {self.total_recipients} recipients"
+    
+    COUNTER_FIELDS = ('total_recipients', 'sent_count', 'delivered_count', 'failed_count')
+    
+    def inc(self, field, n=1):
+        """Add n to a counter with a single atomic UPDATE
+        
+        Safe when several workers report progress on the same campaign; the
+        instance's own value is raised by n as well.
+        """
+        if field not in self.COUNTER_FIELDS:
+            raise ValueError(f"{field} is not a BulkNotification counter")
+        type(self).objects.filter(pk=self.pk).update(**{field: models.F(field) + n})
+        setattr(self, field, getattr(self, field) + n)
+    
+    def resolve_recipients(self):
+        """Return the campaign's recipients as a queryset
+        
+        Only custom campaigns store their recipients in target_members; the
+        other target types are worked out when the campaign is sent.
+        """
+        from members.models import Member, User
+        from repayments.models import OPEN_STATUSES, RepaymentSchedule
+        
+        members = Member.objects.only(
+            'id', 'user_id', 'member_number', 'full_name', 'phone_number', 'email'
+        )
+        users = User.objects.only(
+            'id', 'username', 'first_name', 'last_name', 'phone_number', 'email'
+        )
+        if self.target_type == 'all_members':
+            return members
+        if self.target_type == 'active_members':
+            return members.filter(status='active')
+        if self.target_type == 'overdue_members':
+            return members.filter(models.Exists(
+                RepaymentSchedule.objects.filter(
+                    loan__member=models.OuterRef('pk'),
+                    loan__status='active',
+                    due_date__lt=timezone.now().date(),
+                    status__in=OPEN_STATUSES
+                )
+            ))
+        if self.target_type == 'loan_officers':
+            return users.filter(role='loan_officer')
+        if self.target_type == 'staff':
+            return users.filter(role__in=['admin', 'accountant', 'loan_officer'])
+        return members.filter(pk__in=self.target_members.values('pk'))
+    
+    def create_notifications(self, chunk_size=1000):
+        """Create the campaign's notifications, chunk_size recipients at a time"""
+        recipient_sets = [self.resolve_recipients()]
+        if self.target_type == 'custom':
+            recipient_sets.append(self.target_users.only(
+                'id', 'username', 'first_name', 'last_name', 'phone_number', 'email'
+            ))
+        for recipients in recipient_sets:
+            chunk = []
+            for recipient in recipients.order_by('pk').iterator(chunk_size=chunk_size):
+                chunk.append(recipient)
+                if len(chunk) >= chunk_size:
+                    Notification.objects.create_for_bulk(self, chunk)
+                    chunk = []
+            if chunk:
+                Notification.objects.create_for_bulk(self, chunk)
+        return self.total_recipients
 
 
 class SMSProvider(models.Model):
@@ -344,6 +726,98 @@ class SMSProvider(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.get_provider_type_display()})"
+    
+    # Seconds other processes may keep using a provider changed elsewhere
+    ACTIVE_CACHE_TIMEOUT = 60
+    
+    @classmethod
+    def get_active(cls):
+        """Return the active default provider, or None, without a query per message
+        
+        The provider is kept in the process, so its HTTP session is reused,
+        and dropped when any provider is saved or deleted in this process.
+        Other processes reload it after ACTIVE_CACHE_TIMEOUT seconds.
+        """
+        global _active_sms_provider
+        now = time.monotonic()
+        if _active_sms_provider is None or now - _active_sms_provider[1] > cls.ACTIVE_CACHE_TIMEOUT:
+            provider = cls.objects.filter(is_default=True, is_active=True).first()
+            _active_sms_provider = (provider, now)
+        return _active_sms_provider[0]
+    
+    @staticmethod
+    def clear_active_cache():
+        """Forget the provider kept by get_active()"""
+        global _active_sms_provider
+        _active_sms_provider = None
+    
+    @cached_property
+    def session(self):
+        """HTTP session reused for every request to this provider's API"""
+        import requests
+        session = requests.Session()
+        session.headers['User-Agent'] = settings.SACCO_SETTINGS['COMPANY_NAME']
+        return session
+
+
+class NotificationLogManager(models.Manager):
+    """Manager joining in the logged notification"""
+    
+    flush_size = 200
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('notification')
+    
+    def record(self, notification, action, details=None):
+        """Log an action, batched when inside buffered()"""
+        entry = self.model(notification=notification, action=action, details=details or {})
+        entries = getattr(_log_buffer, 'entries', None)
+        if entries is None:
+            entry.save()
+            return
+        entries.append(entry)
+        if len(entries) >= self.flush_size:
+            self.flush()
+    
+    def purge(self, before, chunk_size=10000):
+        """Delete entries logged before the given datetime, chunk_size rows per transaction"""
+        deleted = 0
+        while True:
+            ids = list(
+                self.filter(timestamp__lt=before).order_by('timestamp')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return deleted
+            deleted += self.filter(pk__in=ids).delete()[0]
+    
+    def flush(self):
+        entries = getattr(_log_buffer, 'entries', None)
+        if entries:
+            self.bulk_create(entries, batch_size=1000)
+            entries.clear()
+    
+    @contextmanager
+    def buffered(self):
+        """Collect the entries record()ed inside the block into bulk inserts
+            
+            with NotificationLog.objects.buffered():
+                for notification in batch:
+                    NotificationLog.objects.record(notification, 'sent')
+        
+        Entries are written every flush_size records and when the block
+        exits; if it raises, entries not yet flushed are dropped.
+        """
+        if getattr(_log_buffer, 'entries', None) is not None:
+            # Nested block; the outermost one flushes
+            yield
+            return
+        _log_buffer.entries = []
+        try:
+            yield
+            self.flush()
+        finally:
+            _log_buffer.entries = None
 
 
 class NotificationLog(models.Model):
@@ -367,18 +841,37 @@ class NotificationLog(models.Model):
         related_name='logs'
     )
     action = models.CharField(max_length=20, choices=ACTION_TYPES)
-    details = models.JSONField(blank=True, null=True)
+    details = models.JSONField(encoder=DjangoJSONEncoder, default=dict, blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     
+    objects = NotificationLogManager()
+    
     class Meta:
         ordering = ['-timestamp']
         verbose_name = 'Notification Log'
         verbose_name_plural = 'Notification Logs'
+        indexes = [
+            models.Index(fields=['notification', '-timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.notification.subject} - {self.get_action_display()}"
 
 
+class NotificationPreferenceManager(models.Manager):
+    """Manager fetching the preferences of many users at once"""
+    
+    def for_users(self, user_ids):
+        """Return {user_id: preference} for user_ids with one query
+        
+        Users without saved preferences share an unsaved instance holding
+        the defaults.
+        """
+        found = {p.user_id: p for p in self.filter(user_id__in=user_ids)}
+        default = self.model()
+        return {user_id: found.get(user_id, default) for user_id in user_ids}
+
+
 class NotificationPreference(models.Model):
     """User preferences for notifications"""
     
@@ -409,6 +902,8 @@ class NotificationPreference(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = NotificationPreferenceManager()
+    
     class Meta:
         verbose_name = 'Notification Preference'
         verbose_name_plural = 'Notification Preferences'
@@ -417,6 +912,13 @@ class NotificationPreference(models.Model):
         return f"Preferences for {self.user.username}"
 
 
+class NotificationQueueManager(models.Manager):
+    """Manager joining in the queued notification and its template"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('notification', 'notification__template')
+
+
 class NotificationQueue(models.Model):
     """Queue for processing notifications"""
     
@@ -448,13 +950,60 @@ class NotificationQueue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = NotificationQueueManager()
+    
     class Meta:
         ordering = ['priority', 'scheduled_for']
         verbose_name = 'Notification Queue'
         verbose_name_plural = 'Notification Queue'
+        indexes = [
+            # Only rows the dispatcher can still pick up are indexed
+            models.Index(
+                fields=['priority', 'scheduled_for'],
+                condition=models.Q(status__in=['pending', 'retrying']),
+                name='nq_pending_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Queue: {self.notification.subject} - {self.status}"
+    
+    @classmethod
+    def pending_iter(cls, chunk_size=500):
+        """Stream (id, notification_id) dicts for entries due for dispatch, in queue order"""
+        return cls.objects.filter(
+            status__in=['pending', 'retrying'],
+            scheduled_for__lte=timezone.now()
+        ).order_by('priority', 'scheduled_for').values('id', 'notification_id').iterator(
+            chunk_size=chunk_size
+        )
+    
+    @classmethod
+    def pending_batches(cls, chunk_size=500):
+        """Yield (queue_ids, notifications) for due entries, chunk_size at a time
+        
+        Each chunk's notifications are fetched with one query instead of
+        hydrating every queue entry with its notification.
+        """
+        batch = []
+        for entry in cls.pending_iter(chunk_size):
+            batch.append(entry)
+            if len(batch) == chunk_size:
+                yield cls._load_batch(batch)
+                batch = []
+        if batch:
+            yield cls._load_batch(batch)
+    
+    @staticmethod
+    def _load_batch(batch):
+        notifications = Notification.objects.light_list().in_bulk(
+            [entry['notification_id'] for entry in batch]
+        )
+        return (
+            [entry['id'] for entry in batch],
+            [notifications[entry['notification_id']] for entry in batch
+             if entry['notification_id'] in notifications]
+        )
 
 
 class AutomatedNotificationRule(models.Model):
@@ -504,3 +1053,8 @@ class AutomatedNotificationRule(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.get_trigger_event_display()}"
+
+
+@receiver([post_save, post_delete], sender=SMSProvider)
+def clear_active_sms_provider(sender, **kwargs):
+    SMSProvider.clear_active_cache()
@@ -1,3 +1,125 @@
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from loans.tests import make_loan
+from members.tests import make_member
+
+from .models import (
+    Notification, NotificationLog, NotificationQueue, NotificationTemplate, uuid7,
+)
+
+
+class NotificationTemplateRenderTests(TestCase):
+    
+    def make_template(self, body):
+        return NotificationTemplate.objects.create(
+            name='Reminder', template_type='repayment_reminder', channel='both',
+            sms_message=body, email_message=body
+        )
+    
+    def test_fast_path_matches_engine(self):
+        template = self.make_template('Dear {{ name }}, {{ amount }} is due {{ due }} ({{ sent }}){{ missing }}')
+        self.assertIsNotNone(template.compiled_cache['sms'])
+        context = {
+            'name': 'Jane',
+            'amount': Decimal('1060.50'),
+            'due': date(2026, 1, 5),
+            'sent': datetime(2026, 1, 5, 6, 30, tzinfo=dt_timezone.utc),
+        }
+        for channel in ['sms', 'email']:
+            with self.subTest(channel=channel):
+                self.assertEqual(
+                    template.render_fast(channel, context), template.render(channel, context)
+                )
+        self.assertEqual(
+            template.render_fast('sms', context),
+            'Dear Jane, 1060.50 is due Jan. 5, 2026 (Jan. 5, 2026, 9:30 a.m.)'
+        )
+    
+    def test_bodies_with_filters_use_the_engine(self):
+        template = self.make_template('Hi {{ name|upper }}')
+        self.assertIsNone(template.compiled_cache['sms'])
+        self.assertEqual(template.render_fast('sms', {'name': 'jane'}), 'Hi JANE')
+    
+    def test_variables_and_missing_variables(self):
+        template = self.make_template('{{ name }} owes {{ amount }}')
+        self.assertEqual(template.variables, ['name', 'amount'])
+        self.assertEqual(template.missing_variables({'name': 'Jane'}), ['amount'])
+
+
+class UUID7Tests(TestCase):
+    
+    def test_version_variant_and_order(self):
+        values = [uuid7() for _ in range(100)]
+        self.assertTrue(all(value.version == 7 and value.variant == 'specified in RFC 4122' for value in values))
+        self.assertEqual(len(set(values)), 100)
+        self.assertEqual(
+            [value.int >> 80 for value in values], sorted(value.int >> 80 for value in values)
+        )
+
 
-# Create your tests here.
+class NotificationQueryTests(TestCase):
+    
+    def setUp(self):
+        template = NotificationTemplate.objects.create(
+            name='Reminder', template_type='repayment_reminder', channel='sms',
+            sms_message='{{ amount }} is due'
+        )
+        for number in range(3):
+            member = make_member(number)
+            loan = make_loan(member, installments=1)
+            notification = Notification.objects.create(
+                recipient_user=member.user, recipient_member=member, template=template,
+                related_loan=loan, related_application=loan.application,
+                notification_type='reminder', channel='sms', subject=f'Reminder {number}',
+                message='1060 is due', html_message='<p>1060 is due</p>' * 100,
+                delivery_report={'status': 'queued'}, context_data={'amount': '1060'}
+            )
+            NotificationLog.objects.create(notification=notification, action='created')
+            NotificationQueue.objects.create(notification=notification, scheduled_for=timezone.now())
+    
+    def test_notification_listing_is_one_query(self):
+        with self.assertNumQueries(1):
+            rows = [
+                (str(n), n.recipient_user.username, n.template.name,
+                 n.related_loan.loan_number, n.related_application.application_number)
+                for n in Notification.objects.all()
+            ]
+        self.assertEqual(len(rows), 3)
+    
+    def test_log_and_queue_listings_are_one_query(self):
+        with self.assertNumQueries(1):
+            logs = [str(log) for log in NotificationLog.objects.all()]
+        with self.assertNumQueries(1):
+            entries = [(str(entry), entry.notification.template.name) for entry in NotificationQueue.objects.all()]
+        self.assertEqual((len(logs), len(entries)), (3, 3))
+    
+    def test_dispatch_view_reads_only_status_and_scheduling_columns(self):
+        with self.assertNumQueries(1):
+            list(Notification.objects.all())
+        full_sql = connection.queries[-1]['sql']
+        with self.assertNumQueries(1):
+            notifications = list(Notification.objects.dispatch_view())
+            self.assertEqual({n.status for n in notifications}, {'draft'})
+        sql = connection.queries[-1]['sql']
+        self.assertLess(len(sql), len(full_sql) // 4)
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"message"', sql)
+    
+    def test_light_list_skips_html_and_json_columns(self):
+        with self.assertNumQueries(1):
+            subjects = [(n.subject, n.template.name) for n in Notification.objects.light_list()]
+        sql = connection.queries[-1]['sql']
+        for column in ['html_message', 'delivery_report', 'context_data']:
+            self.assertNotIn(column, sql)
+        self.assertEqual(len(subjects), 3)
+    
+    def test_pending_batches_fetch_notifications_per_batch(self):
+        with self.assertNumQueries(3):
+            batches = list(NotificationQueue.pending_batches(chunk_size=2))
+            self.assertEqual([len(notifications) for ids, notifications in batches], [2, 1])
+        self.assertNotIn('html_message', connection.queries[-1]['sql'])
@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:22
+
+from datetime import date
+
+from django.db import migrations, models
+
+
+def seed_counters(apps, schema_editor):
+    """Start each counter after the highest number already issued that day"""
+    TransactionCounter = apps.get_model('repayments', 'TransactionCounter')
+    RepaymentTransaction = apps.get_model('repayments', 'RepaymentTransaction')
+    counters = {}
+    numbers = RepaymentTransaction.objects.filter(transaction_number__startswith='TXN')
+    for number in numbers.values_list('transaction_number', flat=True).iterator():
+        stamp, value = number[3:11], number[11:]
+        if not (stamp.isdigit() and value.isdigit()):
+            continue
+        day = date(int(stamp[:4]), int(stamp[4:6]), int(stamp[6:]))
+        counters[day] = max(counters.get(day, 0), int(value))
+    TransactionCounter.objects.bulk_create(
+        TransactionCounter(day=day, last_value=value)
+        for day, value in counters.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repayments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Transaction Counter',
+                'verbose_name_plural': 'Transaction Counters',
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
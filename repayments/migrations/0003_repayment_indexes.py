@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('members', '0006_member_trigram_indexes'),
+        ('repayments', '0002_transactioncounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repaymentschedule',
+            index=models.Index(fields=['loan', 'status', 'due_date'], name='repayments__loan_id_7cee0f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repaymentschedule',
+            index=models.Index(fields=['status', 'due_date'], name='repayments__status_330d0d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repaymenttransaction',
+            index=models.Index(fields=['loan', 'status', '-transaction_date'], name='repayments__loan_id_e59ef2_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:31
+
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('repayments', '0003_repayment_indexes'),
+    ]
+
+    # A column cannot be altered into a generated one, so each is dropped
+    # and added back; the database fills the new columns from the amounts
+    operations = [
+        migrations.RemoveField(
+            model_name='repaymentschedule',
+            name='interest_outstanding',
+        ),
+        migrations.AddField(
+            model_name='repaymentschedule',
+            name='interest_outstanding',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('interest_amount'), '-', models.F('interest_paid')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.RemoveField(
+            model_name='repaymentschedule',
+            name='principal_outstanding',
+        ),
+        migrations.AddField(
+            model_name='repaymentschedule',
+            name='principal_outstanding',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('principal_amount'), '-', models.F('principal_paid')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+        migrations.RemoveField(
+            model_name='repaymentschedule',
+            name='total_outstanding',
+        ),
+        migrations.AddField(
+            model_name='repaymentschedule',
+            name='total_outstanding',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('principal_amount'), '-', models.F('principal_paid')), '+', models.F('interest_amount')), '-', models.F('interest_paid')), '+', models.F('penalty_outstanding')), '-', models.F('penalty_paid')), output_field=models.DecimalField(decimal_places=2, max_digits=12)),
+        ),
+    ]
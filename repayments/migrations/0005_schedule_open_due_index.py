@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('repayments', '0004_schedule_generated_outstanding'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='repaymentschedule',
+            name='repayments__loan_id_7cee0f_idx',
+        ),
+        migrations.AddIndex(
+            model_name='repaymentschedule',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'partial', 'overdue'))), fields=['loan', 'due_date'], name='schedule_open_due_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:35
+
+from django.db import migrations, models
+
+STATUS_CODES = {'pending': '0', 'paid': '1', 'partial': '2', 'overdue': '3', 'waived': '4'}
+
+
+def _recode(apps, mapping):
+    RepaymentSchedule = apps.get_model('repayments', 'RepaymentSchedule')
+    RepaymentSchedule.objects.update(status=models.Case(
+        *[models.When(status=old, then=models.Value(new)) for old, new in mapping.items()],
+        default=models.F('status')
+    ))
+
+
+def statuses_to_codes(apps, schema_editor):
+    """Rewrite status names as the digits the integer column casts from"""
+    _recode(apps, STATUS_CODES)
+
+
+def codes_to_statuses(apps, schema_editor):
+    _recode(apps, {code: name for name, code in STATUS_CODES.items()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loandocument_reference_number'),
+        ('repayments', '0005_schedule_open_due_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='repaymentschedule',
+            name='schedule_open_due_idx',
+        ),
+        migrations.RunPython(statuses_to_codes, codes_to_statuses),
+        migrations.AlterField(
+            model_name='repaymentschedule',
+            name='status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Pending'), (1, 'Paid'), (2, 'Partially Paid'), (3, 'Overdue'), (4, 'Waived')], default=0),
+        ),
+        migrations.AddIndex(
+            model_name='repaymentschedule',
+            index=models.Index(condition=models.Q(('status__in', (0, 2, 3))), fields=['loan', 'due_date'], name='schedule_open_due_idx'),
+        ),
+    ]
@@ -1,19 +1,240 @@
-from django.db import models
+from django.db import models, connection, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Cast, Greatest, Round
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
 from decimal import Decimal
 from datetime import date, timedelta
 
+# Installment statuses, stored as small integers
+STATUS_PENDING, STATUS_PAID, STATUS_PARTIAL, STATUS_OVERDUE, STATUS_WAIVED = range(5)
+
+# Installment statuses that still have an amount to collect
+OPEN_STATUSES = (STATUS_PENDING, STATUS_PARTIAL, STATUS_OVERDUE)
+
+# Installment status by (fully paid, anything paid, past due) bits; being
+# fully paid wins over a part payment, which wins over being past due
+_STATUS_TABLE = {
+    0b000: STATUS_PENDING,
+    0b001: STATUS_OVERDUE,
+    0b010: STATUS_PARTIAL,
+    0b011: STATUS_PARTIAL,
+    0b100: STATUS_PAID,
+    0b101: STATUS_PAID,
+    0b110: STATUS_PAID,
+    0b111: STATUS_PAID,
+}
+
+# Monthly penalty rate in basis points (5.0% -> 500)
+_PENALTY_RATE_BP = round(settings.SACCO_SETTINGS.get('PENALTY_RATE', 5.0) * 100)
+# The same rate as a percentage, as stored on PenaltyTransaction
+_PENALTY_RATE = Decimal(_PENALTY_RATE_BP).scaleb(-2)
+
+
+def _cents(amount):
+    """Whole cents in a two-place Decimal amount"""
+    return int(amount * 100)
+
+
+def _allocate(remaining, buckets):
+    """Fill buckets in order from remaining, all in cents
+    
+    Returns the amount put in each bucket and what is left over.
+    """
+    paid = []
+    for bucket in buckets:
+        payment = min(remaining, bucket)
+        paid.append(payment)
+        remaining -= payment
+    return paid, remaining
+
+
+def _penalty_cents(total_outstanding, days_overdue):
+    """Penalty on total_outstanding per 30 days overdue, in whole cents
+    rounded half up"""
+    numerator = _cents(total_outstanding) * _PENALTY_RATE_BP * days_overdue
+    denominator = 100 * 100 * 30
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+class DaysSince(models.Func):
+    """Whole days from a date column up to day, worked out by the database"""
+    
+    template = '(%(expressions)s)'
+    arg_joiner = ' - '
+    output_field = models.IntegerField()
+    
+    def __init__(self, expression, day):
+        super().__init__(models.Value(day, output_field=models.DateField()), expression)
+    
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(JULIANDAY(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - JULIANDAY(',
+            **extra_context
+        )
+    
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='DATEDIFF', template='%(function)s(%(expressions)s)',
+            arg_joiner=', ', **extra_context
+        )
+
+
+class _AmountField(models.DecimalField):
+    """Output field quantizing computed amounts to decimal_places
+    
+    SQLite hands back computed decimals as floats, which Django does not
+    quantize unless they come straight from a column.
+    """
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Decimal(value).quantize(Decimal(1).scaleb(-self.decimal_places))
+
+
+class RepaymentScheduleQuerySet(models.QuerySet):
+    
+    def with_computed_status(self, today=None):
+        """Annotate each installment with computed_status, the status save()
+        would give it now
+        
+        Listings can show current statuses without loading and re-saving
+        each installment; the stored status is refreshed at payment time
+        and by mark_overdue().
+        """
+        today = today or date.today()
+        return self.annotate(
+            computed_status=models.Case(
+                models.When(status=STATUS_WAIVED, then=models.Value(STATUS_WAIVED)),
+                models.When(
+                    total_paid__gte=models.F('total_amount') + models.F('penalty_outstanding'),
+                    then=models.Value(STATUS_PAID)
+                ),
+                models.When(total_paid__gt=0, then=models.Value(STATUS_PARTIAL)),
+                models.When(due_date__lt=today, then=models.Value(STATUS_OVERDUE)),
+                default=models.Value(STATUS_PENDING),
+                output_field=models.PositiveSmallIntegerField()
+            )
+        )
+    
+    def with_penalty(self, today=None):
+        """Annotate each installment with penalty, what calculate_penalty()
+        would return, worked out and rounded by the database
+        
+        Penalty reports read the annotation instead of loading each
+        installment to compute it in Python.
+        """
+        today = today or date.today()
+        # Whole cents and integer division, as in _penalty_cents(); SQLite
+        # stores whole amounts as integers, so dividing amounts directly
+        # would truncate there
+        cents = Cast(Round(models.F('total_outstanding') * 100), models.BigIntegerField())
+        denominator = 100 * 100 * 30
+        penalty_cents = (
+            cents * (2 * _PENALTY_RATE_BP) * models.F('days_overdue') + denominator
+        ) / (2 * denominator)
+        return self.annotate(
+            penalty=models.Case(
+                models.When(
+                    status__in=OPEN_STATUSES,
+                    due_date__lt=today,
+                    then=penalty_cents * models.Value(Decimal('0.01'))
+                ),
+                default=models.Value(Decimal('0.00')),
+                output_field=_AmountField(max_digits=12, decimal_places=2)
+            )
+        )
+
+
+class RepaymentScheduleManager(models.Manager.from_queryset(RepaymentScheduleQuerySet)):
+    """Manager with the set-based nightly overdue and penalty sweeps
+    
+    The loan is joined in by default, as every listing of installments
+    shows its loan number.
+    """
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('loan')
+    
+    def mark_overdue(self, today=None):
+        """Refresh days_overdue on every open installment past its due date
+        and flag unpaid ones as overdue, in one UPDATE
+        
+        Partially paid installments keep their status, as in save().
+        """
+        today = today or date.today()
+        open_past_due = self.filter(
+            status__in=OPEN_STATUSES,
+            due_date__lt=today
+        )
+        return open_past_due.update(
+            days_overdue=DaysSince('due_date', today),
+            status=models.Case(
+                models.When(status=STATUS_PENDING, then=models.Value(STATUS_OVERDUE)),
+                default=models.F('status'),
+                output_field=models.PositiveSmallIntegerField()
+            ),
+            updated_at=timezone.now()
+        )
+    
+    def apply_penalties(self, applied_by=None, today=None):
+        """Record today's penalty for every overdue installment with bulk inserts
+        
+        Installments already penalised today are skipped, so the sweep can
+        be rerun safely.
+        """
+        today = today or date.today()
+        rows = self.filter(
+            status__in=OPEN_STATUSES,
+            due_date__lt=today,
+            days_overdue__gt=0
+        ).exclude(
+            penalties__applied_date=today
+        ).values_list('id', 'loan_id', 'total_outstanding', 'days_overdue')
+        
+        penalties = []
+        for schedule_id, loan_id, total_outstanding, days_overdue in rows.iterator():
+            cents = _penalty_cents(total_outstanding, days_overdue)
+            if cents:
+                penalties.append(PenaltyTransaction(
+                    loan_id=loan_id,
+                    repayment_schedule_id=schedule_id,
+                    penalty_amount=Decimal(cents).scaleb(-2),
+                    penalty_rate=_PENALTY_RATE,
+                    days_overdue=days_overdue,
+                    applied_date=today,
+                    applied_by=applied_by,
+                ))
+        return PenaltyTransaction.objects.bulk_create(penalties, batch_size=1000)
+
+
+class RepaymentTransactionManager(models.Manager):
+    """Manager joining in the loan and member every listing of repayments shows"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('loan', 'member')
+
+
+class PenaltyTransactionManager(models.Manager):
+    """Manager joining in the penalised loan"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('loan')
+
 
 class RepaymentSchedule(models.Model):
     """Scheduled repayment installments for loans"""
     
     STATUS_CHOICES = [
-        ('pending', 'Pending'),
-        ('paid', 'Paid'),
-        ('partial', 'Partially Paid'),
-        ('overdue', 'Overdue'),
-        ('waived', 'Waived'),
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PAID, 'Paid'),
+        (STATUS_PARTIAL, 'Partially Paid'),
+        (STATUS_OVERDUE, 'Overdue'),
+        (STATUS_WAIVED, 'Waived'),
     ]
     
     loan = models.ForeignKey('loans.Loan', on_delete=models.CASCADE, related_name='repayment_schedule')
@@ -31,29 +252,83 @@ class RepaymentSchedule(models.Model):
     penalty_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     
-    # Outstanding
-    principal_outstanding = models.DecimalField(max_digits=12, decimal_places=2)
-    interest_outstanding = models.DecimalField(max_digits=12, decimal_places=2)
+    # Outstanding; all but the penalty are computed by the database
+    principal_outstanding = models.GeneratedField(
+        expression=models.F('principal_amount') - models.F('principal_paid'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True
+    )
+    interest_outstanding = models.GeneratedField(
+        expression=models.F('interest_amount') - models.F('interest_paid'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True
+    )
     penalty_outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0)
-    total_outstanding = models.DecimalField(max_digits=12, decimal_places=2)
+    total_outstanding = models.GeneratedField(
+        expression=(models.F('principal_amount') - models.F('principal_paid') +
+                    models.F('interest_amount') - models.F('interest_paid') +
+                    models.F('penalty_outstanding') - models.F('penalty_paid')),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        db_persist=True
+    )
     
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=STATUS_PENDING)
     payment_date = models.DateField(null=True, blank=True)
     days_overdue = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = RepaymentScheduleManager()
+    
     class Meta:
         ordering = ['loan', 'installment_number']
         unique_together = ['loan', 'installment_number']
         verbose_name = 'Repayment Schedule'
         verbose_name_plural = 'Repayment Schedules'
+        indexes = [
+            # Open installments of a loan in due date order, for allocation
+            models.Index(
+                fields=['loan', 'due_date'],
+                condition=models.Q(status__in=OPEN_STATUSES),
+                name='schedule_open_due_idx'
+            ),
+            models.Index(fields=['status', 'due_date']),
+        ]
     
     def __str__(self):
         return f"{self.loan.loan_number} - Installment {self.installment_number}"
     
+    # Stored fields refresh_balances() derives from the amounts and payments
+    BALANCE_FIELDS = ['status', 'payment_date', 'days_overdue']
+    
+    # Fields refresh_balances() reads
+    BALANCE_INPUTS = frozenset([
+        'principal_amount', 'interest_amount', 'total_amount',
+        'principal_paid', 'interest_paid', 'penalty_paid', 'total_paid',
+        'penalty_outstanding', 'due_date',
+    ])
+    
     def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        # Saves that touch none of the amounts or the due date leave the
+        # derived fields as they are
+        if update_fields is None or self.BALANCE_INPUTS.intersection(update_fields):
+            self.refresh_balances()
+            # A narrow save(update_fields=[...]) writes the derived fields too
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.BALANCE_FIELDS, 'updated_at'}
+        super().save(*args, **kwargs)
+    
+    def refresh_balances(self, today=None):
+        """Recompute outstanding amounts and status from the amounts paid
+        
+        The outstanding amounts are generated columns; they are worked out
+        here only to keep the instance in step with what the database will
+        store.
+        """
+        today = today or date.today()
+        
         # Calculate outstanding amounts
         self.principal_outstanding = self.principal_amount - self.principal_paid
         self.interest_outstanding = self.interest_amount - self.interest_paid
@@ -62,38 +337,84 @@ class RepaymentSchedule(models.Model):
                                 self.penalty_outstanding - self.penalty_paid)
         
         # Update status based on payments
-        if self.total_paid >= self.total_amount + self.penalty_outstanding:
-            self.status = 'paid'
+        self.status = _STATUS_TABLE[
+            (self.total_paid >= self.total_amount + self.penalty_outstanding) << 2
+            | (self.total_paid > 0) << 1
+            | (self.due_date < today)
+        ]
+        if self.status == STATUS_PAID:
             if not self.payment_date:
-                self.payment_date = date.today()
-        elif self.total_paid > 0:
-            self.status = 'partial'
-        elif self.due_date < date.today():
-            self.status = 'overdue'
-            self.days_overdue = (date.today() - self.due_date).days
-        else:
-            self.status = 'pending'
-        
-        super().save(*args, **kwargs)
+                self.payment_date = today
+        elif self.status == STATUS_OVERDUE:
+            self.days_overdue = (today - self.due_date).days
+    
+    def _is_overdue(self, today=None):
+        return self.due_date < (today or date.today()) and self.status in OPEN_STATUSES
     
     @property
     def is_overdue(self):
         """Check if installment is overdue"""
-        return self.due_date < date.today() and self.status in ['pending', 'partial']
+        return self._is_overdue()
     
     @property
     def penalty_amount(self):
         """Calculate penalty for overdue installment"""
-        if not self.is_overdue:
+        return self.calculate_penalty()
+    
+    def calculate_penalty(self, today=None):
+        """Calculate penalty for overdue installment as of today
+        
+        Penalty sweeps pass the same today to every installment.
+        """
+        if not self._is_overdue(today):
             return Decimal('0.00')
         
-        # Get penalty rate from settings
-        from django.conf import settings
-        penalty_rate = Decimal(str(settings.SACCO_SETTINGS.get('PENALTY_RATE', 5.0))) / 100
+        return Decimal(_penalty_cents(self.total_outstanding, self.days_overdue)).scaleb(-2)
+
+
+class TransactionCounter(models.Model):
+    """Per-day counters used to mint transaction numbers"""
+    
+    day = models.DateField(unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Transaction Counter'
+        verbose_name_plural = 'Transaction Counters'
+    
+    def __str__(self):
+        return f"Transactions {self.day}: {self.last_value}"
+    
+    @classmethod
+    def reserve(cls, day, n=1):
+        """Reserve the next n numbers for day and return them as a range
         
-        # Calculate penalty based on outstanding amount and days overdue
-        penalty = self.total_outstanding * penalty_rate * (self.days_overdue / 30)
-        return penalty.quantize(Decimal('0.01'))
+        The counter is bumped and read back by a single UPDATE ... RETURNING,
+        so concurrent payments never read the latest transaction to find
+        the next number.
+        """
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET last_value = last_value + %s "
+                f"WHERE day = %s RETURNING last_value",
+                [n, connection.ops.adapt_datefield_value(day)]
+            )
+            row = cursor.fetchone()
+        if row is None:
+            # First transaction of the day; create the counter after any
+            # number already issued for the day and try again
+            cls.objects.get_or_create(day=day, defaults={'last_value': cls._last_issued(day)})
+            return cls.reserve(day, n)
+        return range(row[0] - n + 1, row[0] + 1)
+    
+    @staticmethod
+    def _last_issued(day):
+        """Highest number already used on day, read as a single MAX() value"""
+        last = RepaymentTransaction.objects.filter(
+            transaction_number__startswith=f"TXN{day.strftime('%Y%m%d')}"
+        ).aggregate(last=models.Max('transaction_number'))['last']
+        return int(last[-4:]) if last and last[-4:].isdigit() else 0
 
 
 class RepaymentTransaction(models.Model):
@@ -160,10 +481,15 @@ class RepaymentTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = RepaymentTransactionManager()
+    
     class Meta:
         ordering = ['-transaction_date']
         verbose_name = 'Repayment Transaction'
         verbose_name_plural = 'Repayment Transactions'
+        indexes = [
+            models.Index(fields=['loan', 'status', '-transaction_date']),
+        ]
     
     def __str__(self):
         return f"{self.transaction_number} - {self.loan.loan_number} - {self.amount}"
@@ -171,89 +497,140 @@ class RepaymentTransaction(models.Model):
     def save(self, *args, **kwargs):
         if not self.transaction_number:
             # Generate transaction number
-            from datetime import datetime
-            today = datetime.now()
-            prefix = f"TXN{today.strftime('%Y%m%d')}"
+            today = date.today()
+            value = TransactionCounter.reserve(today)[0]
+            self.transaction_number = f"TXN{today.strftime('%Y%m%d')}{str(value).zfill(4)}"
+        
+        # The payment, the loan balances and the schedule allocation commit
+        # together; the number above is reserved outside so that the day's
+        # counter row is not held locked meanwhile
+        with transaction.atomic():
+            if self.status == 'completed':
+                # Payments on the same loan are applied one at a time
+                from loans.models import Loan
+                Loan.objects.select_for_update().only('pk').get(pk=self.loan_id)
             
-            last_txn = RepaymentTransaction.objects.filter(
-                transaction_number__startswith=prefix
-            ).order_by('-id').first()
+            super().save(*args, **kwargs)
             
-            if last_txn:
-                last_number = int(last_txn.transaction_number[-4:])
-                self.transaction_number = f"{prefix}{str(last_number + 1).zfill(4)}"
-            else:
-                self.transaction_number = f"{prefix}0001"
-        
-        super().save(*args, **kwargs)
-        
-        # Update loan balances if transaction is completed
-        if self.status == 'completed':
-            self.update_loan_balances()
+            # Update loan balances if transaction is completed
+            if self.status == 'completed':
+                self.update_loan_balances()
+    
+    # Loan fields written by update_loan_balances()
+    LOAN_BALANCE_FIELDS = [
+        'total_paid', 'outstanding_balance', 'outstanding_interest',
+        'penalty_balance', 'status', 'completion_percentage', 'updated_at',
+    ]
     
     def update_loan_balances(self):
-        """Update loan outstanding balances after successful payment"""
-        loan = self.loan
-        
-        # Update loan totals
-        loan.total_paid += self.amount
-        loan.outstanding_balance -= self.principal_amount
-        loan.outstanding_interest -= self.interest_amount
-        loan.penalty_balance -= self.penalty_amount
+        """Update loan outstanding balances after successful payment
         
-        # Ensure balances don't go negative
-        loan.outstanding_balance = max(loan.outstanding_balance, Decimal('0.00'))
-        loan.outstanding_interest = max(loan.outstanding_interest, Decimal('0.00'))
-        loan.penalty_balance = max(loan.penalty_balance, Decimal('0.00'))
+        Balances are changed in place by atomic UPDATEs rather than read,
+        adjusted and saved, so concurrent payments on a loan cannot
+        overwrite each other.
+        """
+        from loans.models import Loan
+        zero = models.Value(Decimal('0.00'))
+        loan_rows = Loan.objects.filter(pk=self.loan_id)
         
-        # Check if loan is fully paid
-        total_outstanding = (loan.outstanding_balance + 
-                           loan.outstanding_interest + 
-                           loan.penalty_balance)
+        # Update loan totals; balances don't go negative
+        outstanding_balance = Greatest(models.F('outstanding_balance') - self.principal_amount, zero)
+        outstanding_interest = Greatest(models.F('outstanding_interest') - self.interest_amount, zero)
+        penalty_balance = Greatest(models.F('penalty_balance') - self.penalty_amount, zero)
         
-        if total_outstanding <= Decimal('1.00'):  # Allow for small rounding differences
-            loan.status = 'completed'
+        with transaction.atomic(savepoint=False):
+            loan_rows.update(
+                total_paid=models.F('total_paid') + self.amount,
+                outstanding_balance=outstanding_balance,
+                outstanding_interest=outstanding_interest,
+                penalty_balance=penalty_balance,
+                # Check if loan is fully paid, allowing for small rounding differences
+                status=models.Case(
+                    models.When(
+                        LessThanOrEqual(
+                            outstanding_balance + outstanding_interest + penalty_balance,
+                            Decimal('1.00')
+                        ),
+                        then=models.Value('completed')
+                    ),
+                    default=models.F('status')
+                ),
+                updated_at=timezone.now()
+            )
+            Loan.objects.refresh_completion(loan_rows)
         
-        loan.save()
+        # Keep an already loaded loan in step with the database
+        if type(self).loan.is_cached(self):
+            self.loan.refresh_from_db(fields=self.LOAN_BALANCE_FIELDS)
         
         # Update repayment schedules
         self.allocate_to_schedules()
     
+    # Schedule fields read by allocate_to_schedules()
+    ALLOCATION_READ_FIELDS = [
+        'id', 'due_date', 'status', 'payment_date', 'days_overdue',
+        'principal_amount', 'interest_amount', 'total_amount',
+        'principal_paid', 'interest_paid', 'penalty_paid', 'total_paid',
+        'principal_outstanding', 'interest_outstanding', 'penalty_outstanding',
+        'total_outstanding',
+    ]
+    
+    # Schedule fields written by allocate_to_schedules()
+    ALLOCATED_FIELDS = [
+        'principal_paid', 'interest_paid', 'penalty_paid', 'total_paid', 'updated_at',
+        *RepaymentSchedule.BALANCE_FIELDS,
+    ]
+    
     def allocate_to_schedules(self):
-        """Allocate payment to repayment schedules"""
-        remaining_amount = self.amount
+        """Allocate payment to repayment schedules
         
-        # Get pending/partial schedules in order
-        schedules = RepaymentSchedule.objects.filter(
-            loan=self.loan,
-            status__in=['pending', 'partial', 'overdue']
-        ).order_by('due_date')
+        The schedules paid into are written back with one bulk UPDATE
+        rather than a save() each.
+        """
+        remaining_amount = self.amount
+        now = timezone.now()
+        today = date.today()
         
-        for schedule in schedules:
-            if remaining_amount <= 0:
-                break
+        with transaction.atomic(savepoint=False):
+            # Get pending/partial schedules in order
+            schedules = RepaymentSchedule.objects.select_related(None).filter(
+                loan_id=self.loan_id,
+                status__in=OPEN_STATUSES
+            ).only(*self.ALLOCATION_READ_FIELDS).order_by('due_date').select_for_update()
             
-            # Calculate how much to pay for this schedule
-            schedule_outstanding = schedule.total_outstanding + schedule.penalty_outstanding
-            payment_for_schedule = min(remaining_amount, schedule_outstanding)
-            
-            if payment_for_schedule > 0:
-                # Allocate payment (penalties first, then interest, then principal)
-                penalty_payment = min(payment_for_schedule, schedule.penalty_outstanding)
-                schedule.penalty_paid += penalty_payment
-                payment_for_schedule -= penalty_payment
-                
-                interest_payment = min(payment_for_schedule, schedule.interest_outstanding)
-                schedule.interest_paid += interest_payment
-                payment_for_schedule -= interest_payment
-                
-                principal_payment = min(payment_for_schedule, schedule.principal_outstanding)
-                schedule.principal_paid += principal_payment
+            # Amounts are handled in whole cents inside the loop
+            remaining = _cents(remaining_amount)
+            updated = []
+            # A payment usually clears the first one or two installments, so
+            # rows are fetched a few at a time rather than all at once
+            for schedule in schedules.iterator(chunk_size=16):
+                if remaining <= 0:
+                    break
                 
-                schedule.total_paid += (penalty_payment + interest_payment + principal_payment)
-                schedule.save()
+                # Calculate how much to pay for this schedule
+                schedule_outstanding = _cents(schedule.total_outstanding + schedule.penalty_outstanding)
+                payment_for_schedule = min(remaining, schedule_outstanding)
                 
-                remaining_amount -= (penalty_payment + interest_payment + principal_payment)
+                if payment_for_schedule > 0:
+                    # Allocate payment (penalties first, then interest, then principal)
+                    (penalty_payment, interest_payment, principal_payment), _ = _allocate(
+                        payment_for_schedule,
+                        [_cents(schedule.penalty_outstanding),
+                         _cents(schedule.interest_outstanding),
+                         _cents(schedule.principal_outstanding)]
+                    )
+                    paid = penalty_payment + interest_payment + principal_payment
+                    schedule.penalty_paid += Decimal(penalty_payment).scaleb(-2)
+                    schedule.interest_paid += Decimal(interest_payment).scaleb(-2)
+                    schedule.principal_paid += Decimal(principal_payment).scaleb(-2)
+                    schedule.total_paid += Decimal(paid).scaleb(-2)
+                    schedule.refresh_balances(today)
+                    schedule.updated_at = now
+                    updated.append(schedule)
+                    
+                    remaining -= paid
+            
+            RepaymentSchedule.objects.bulk_update(updated, self.ALLOCATED_FIELDS, batch_size=500)
 
 
 class PenaltyTransaction(models.Model):
@@ -298,6 +675,8 @@ class PenaltyTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = PenaltyTransactionManager()
+    
     class Meta:
         verbose_name = 'Penalty Transaction'
         verbose_name_plural = 'Penalty Transactions'
@@ -1,3 +1,148 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from loans.tests import make_loan
+from members.tests import make_member
+
+from .models import (
+    STATUS_OVERDUE, STATUS_PAID, STATUS_PARTIAL, STATUS_PENDING,
+    PenaltyTransaction, RepaymentSchedule, RepaymentTransaction,
+)
+
+
+class MarkOverdueTests(TestCase):
+    
+    def setUp(self):
+        self.today = date.today()
+        # Due 60 and 30 days ago, today and in 30 days, all left pending as
+        # if the sweep had not run since they were created
+        self.loan = make_loan(make_member(), installments=4, first_due=self.today - timedelta(days=60))
+        RepaymentSchedule.objects.update(status=STATUS_PENDING, days_overdue=0)
+        self.schedules = list(RepaymentSchedule.objects.filter(loan=self.loan).order_by('due_date'))
+    
+    def test_flags_past_due_installments_with_their_days_overdue(self):
+        self.assertEqual(RepaymentSchedule.objects.mark_overdue(self.today), 2)
+        self.assertEqual(
+            list(RepaymentSchedule.objects.filter(loan=self.loan)
+                 .order_by('due_date').values_list('status', 'days_overdue')),
+            [(STATUS_OVERDUE, 60), (STATUS_OVERDUE, 30), (STATUS_PENDING, 0), (STATUS_PENDING, 0)]
+        )
+    
+    def test_part_paid_installments_keep_their_status(self):
+        RepaymentSchedule.objects.filter(pk=self.schedules[0].pk).update(
+            status=STATUS_PARTIAL, total_paid=Decimal('100')
+        )
+        RepaymentSchedule.objects.filter(pk=self.schedules[1].pk).update(status=STATUS_PAID)
+        RepaymentSchedule.objects.mark_overdue(self.today)
+        self.assertEqual(
+            list(RepaymentSchedule.objects.filter(loan=self.loan)
+                 .order_by('due_date').values_list('status', 'days_overdue')[:2]),
+            [(STATUS_PARTIAL, 60), (STATUS_PAID, 0)]
+        )
+    
+    def test_one_statement_whatever_the_number_of_due_dates(self):
+        make_loan(make_member(1), installments=40, first_due=self.today - timedelta(days=2000))
+        with CaptureQueriesContext(connection) as queries:
+            RepaymentSchedule.objects.mark_overdue(self.today)
+        self.assertEqual(len(queries), 1)
+        self.assertLess(len(queries[0]['sql']), 1000)
+        self.assertEqual(
+            RepaymentSchedule.objects.get(due_date=self.today - timedelta(days=2000)).days_overdue,
+            2000
+        )
+
+
+class PenaltyTests(TestCase):
+    
+    def test_penalties_are_recorded_once_a_day(self):
+        loan = make_loan(make_member(), installments=2, first_due=date.today() - timedelta(days=30))
+        RepaymentSchedule.objects.mark_overdue()
+        schedule = RepaymentSchedule.objects.get(loan=loan, days_overdue=30)
+        # 5% a month on 1060 for 30 days
+        self.assertEqual(schedule.calculate_penalty(), Decimal('53.00'))
+        self.assertEqual(
+            RepaymentSchedule.objects.with_penalty().get(pk=schedule.pk).penalty, Decimal('53.00')
+        )
+        
+        RepaymentSchedule.objects.apply_penalties()
+        RepaymentSchedule.objects.apply_penalties()
+        
+        penalty = PenaltyTransaction.objects.get()
+        self.assertEqual(
+            (penalty.repayment_schedule_id, penalty.penalty_amount, penalty.days_overdue),
+            (schedule.pk, Decimal('53.00'), 30)
+        )
+    
+    def test_with_penalty_matches_calculate_penalty(self):
+        loan = make_loan(make_member(), installments=1, first_due=date.today() - timedelta(days=95))
+        schedule = RepaymentSchedule.objects.get(loan=loan)
+        for amount in ['1060.00', '1060.07', '999.99', '0.01', '123456.78']:
+            for days in [1, 30, 95, 400]:
+                with self.subTest(amount=amount, days=days):
+                    RepaymentSchedule.objects.filter(pk=schedule.pk).update(
+                        principal_amount=Decimal(amount), interest_amount=0,
+                        total_amount=Decimal(amount), days_overdue=days
+                    )
+                    schedule = RepaymentSchedule.objects.with_penalty().get(pk=schedule.pk)
+                    self.assertEqual(repr(schedule.penalty), repr(schedule.calculate_penalty()))
+        self.assertEqual(schedule.penalty, Decimal('82304.52'))
+
 
-# Create your tests here.
+class AllocationTests(TestCase):
+    
+    def setUp(self):
+        self.member = make_member()
+        self.loan = make_loan(self.member, installments=3, first_due=date.today() - timedelta(days=10))
+    
+    def pay(self, amount):
+        return RepaymentTransaction.objects.create(
+            loan=self.loan, member=self.member, amount=Decimal(amount),
+            transaction_type='cash', status='completed'
+        )
+    
+    def schedules(self):
+        return list(RepaymentSchedule.objects.filter(loan=self.loan).order_by('due_date'))
+    
+    def test_penalty_then_interest_then_principal_then_next_installment(self):
+        RepaymentSchedule.objects.filter(pk=self.schedules()[0].pk).update(
+            penalty_outstanding=Decimal('20')
+        )
+        self.pay('1200.00')
+        first, second, third = self.schedules()
+        self.assertEqual(
+            (first.penalty_paid, first.interest_paid, first.principal_paid, first.status),
+            (Decimal('20.00'), Decimal('60.00'), Decimal('1000.00'), STATUS_PAID)
+        )
+        self.assertEqual(first.payment_date, date.today())
+        self.assertEqual(
+            (second.interest_paid, second.principal_paid, second.status),
+            (Decimal('60.00'), Decimal('60.00'), STATUS_PARTIAL)
+        )
+        self.assertEqual(second.total_outstanding, Decimal('940.00'))
+        self.assertEqual(third.total_paid, Decimal('0'))
+    
+    def test_loan_balances_and_completion(self):
+        payment = self.pay('500.00')
+        self.assertTrue(payment.transaction_number.startswith(f"TXN{date.today():%Y%m%d}"))
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.total_paid, Decimal('500.00'))
+        self.assertEqual(self.loan.status, 'active')
+        self.assertEqual(self.loan.completion_percentage, Decimal('7.86'))
+        self.assertEqual(
+            self.loan.completion_percentage, self.loan.calculate_completion_percentage()
+        )
+        self.assertNotEqual(self.pay('1.00').transaction_number, payment.transaction_number)
+    
+    def test_loaded_loan_sees_overdue_cleared_by_a_payment(self):
+        self.assertTrue(self.loan.is_overdue)
+        self.assertEqual(self.loan.days_overdue, 10)
+        RepaymentTransaction.objects.create(
+            loan=self.loan, member=self.member, amount=Decimal('1060.00'),
+            transaction_type='cash', status='completed'
+        )
+        self.assertEqual(self.loan.days_overdue, 0)
+        self.assertFalse(self.loan.is_overdue)
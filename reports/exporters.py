@@ -0,0 +1,106 @@
+"""Writers turning a report's result rows into its output file
+
+Each writer takes a binary file to write to, the report title, the
+column names, an iterable of row tuples and a progress callback called
+with the number of rows written. Rows are written as they are read, so
+apart from PDF, whose table is laid out as a whole, a report never holds
+its full result set in memory.
+"""
+import csv
+import io
+import itertools
+
+from django.http import StreamingHttpResponse
+from django.utils.html import escape
+
+
+# File extension per Report.format
+EXTENSIONS = {
+    'csv': 'csv',
+    'excel': 'xlsx',
+    'html': 'html',
+    'pdf': 'pdf',
+}
+
+
+def write_csv(file, title, columns, rows, progress):
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='', write_through=True)
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    for done, row in enumerate(rows, 1):
+        writer.writerow(row)
+        progress(done)
+    text.detach()
+
+
+def write_excel(file, title, columns, rows, progress):
+    from openpyxl import Workbook
+    
+    # Write-only workbooks spool each row to a temporary file as it is
+    # appended instead of keeping the worksheet in memory
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(title[:31])
+    worksheet.append(columns)
+    for done, row in enumerate(rows, 1):
+        worksheet.append(row)
+        progress(done)
+    workbook.save(file)
+
+
+def write_html(file, title, columns, rows, progress):
+    file.write((
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{escape(title)}</title></head><body>'
+        f'<h1>{escape(title)}</h1><table><thead><tr>'
+        + ''.join(f'<th>{escape(column)}</th>' for column in columns)
+        + '</tr></thead><tbody>'
+    ).encode('utf-8'))
+    for done, row in enumerate(rows, 1):
+        file.write(('<tr>' + ''.join(f'<td>{escape(value)}</td>' for value in row) + '</tr>').encode('utf-8'))
+        progress(done)
+    file.write(b'</tbody></table></body></html>')
+
+
+def write_pdf(file, title, columns, rows, progress):
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table
+    
+    data = [columns]
+    for done, row in enumerate(rows, 1):
+        data.append(['' if value is None else str(value) for value in row])
+        progress(done)
+    document = SimpleDocTemplate(file, pagesize=landscape(A4), title=title)
+    document.build([
+        Paragraph(escape(title), getSampleStyleSheet()['Title']),
+        Table(data, repeatRows=1),
+    ])
+
+
+WRITERS = {
+    'csv': write_csv,
+    'excel': write_excel,
+    'html': write_html,
+    'pdf': write_pdf,
+}
+
+
+class Echo:
+    """File-like object handing back what is written, for csv.writer"""
+    
+    def write(self, value):
+        return value
+
+
+def export_to_csv_streaming(rows, columns, filename):
+    """Download response sending rows as CSV while they are read
+    
+    rows may be a queryset's values_list().iterator() or any iterable of
+    tuples; nothing is buffered beyond the current row.
+    """
+    writer = csv.writer(Echo())
+    response = StreamingHttpResponse(
+        (writer.writerow(row) for row in itertools.chain([columns], rows)),
+        content_type='text/csv'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
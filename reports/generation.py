@@ -0,0 +1,138 @@
+"""Generation of requested reports outside the request cycle
+
+Callers only create Report rows in pending status. A worker process, the
+generate_reports command, claims them with claim() and builds each with
+generate(), so no HTTP worker waits on the template query or the file
+writing. Report stays the work queue, so generation can be moved to a
+task broker without touching callers.
+"""
+import logging
+import os
+import tempfile
+
+from django.core.files import File
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .exporters import EXTENSIONS, WRITERS
+from .models import Report
+
+logger = logging.getLogger(__name__)
+
+# total_records is written while generating each time this many more rows
+# have been written
+PROGRESS_ROWS = 10000
+
+# Rows fetched from the database at a time while writing a report
+FETCH_SIZE = 2000
+
+# Output files are kept in memory up to this size, then spooled to disk
+SPOOL_SIZE = 1024 * 1024
+
+
+def claim(limit=10):
+    """Mark up to limit pending reports as generating and return their ids
+    
+    On PostgreSQL the rows are locked with SKIP LOCKED, so concurrent
+    workers each claim different reports.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Report.objects.filter(status='pending')
+            .order_by('requested_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        Report.objects.filter(pk__in=ids).update(
+            status='generating', started_at=now, progress_percentage=0, updated_at=now
+        )
+    return ids
+
+
+class Progress:
+    """Callback mirroring the number of rows written to total_records
+    
+    The result size is not known up front, as counting it would run the
+    template query twice, so progress is reported in rows written and
+    progress_percentage only moves to 100 on completion.
+    """
+    
+    def __init__(self, report_id):
+        self.report_id = report_id
+        self.done = 0
+        self.written = 0
+    
+    def __call__(self, done):
+        self.done = done
+        if done >= self.written + PROGRESS_ROWS:
+            Report.objects.filter(pk=self.report_id).update(total_records=done)
+            self.written = done
+
+
+def query_parameters(report):
+    """Named parameters available to the template query"""
+    return {
+        **report.parameters,
+        'date_from': report.date_from,
+        'date_to': report.date_to,
+    }
+
+
+def fetch_rows(cursor, first):
+    """Rows from cursor, FETCH_SIZE at a time, starting with the first chunk"""
+    rows = first
+    while rows:
+        yield from rows
+        rows = cursor.fetchmany(FETCH_SIZE)
+
+
+def generate(report_id):
+    """Run the report's template query and store the output file
+    
+    The report is left completed or failed; errors are recorded on the
+    report rather than raised.
+    """
+    report = Report.objects.get(pk=report_id)
+    sql, params = report.template.query_template, query_parameters(report)
+    try:
+        progress = Progress(report.pk)
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as output:
+            # A server-side cursor on PostgreSQL, so rows are streamed from
+            # the database into the file rather than loaded all at once
+            with connection.chunked_cursor() as cursor:
+                cursor.execute(sql, params)
+                # Named cursors only describe their columns after a fetch
+                first = cursor.fetchmany(FETCH_SIZE)
+                columns = [column[0] for column in cursor.description]
+                WRITERS[report.format](
+                    output, report.title, columns, fetch_rows(cursor, first), progress
+                )
+            file_size = output.seek(0, os.SEEK_END)
+            output.seek(0)
+            report.report_file.save(
+                f'{report.report_id}.{EXTENSIONS[report.format]}', File(output), save=False
+            )
+    except Exception as exc:
+        logger.exception('Generating report %s failed', report.pk)
+        report.status = 'failed'
+        report.error_message = str(exc)
+        report.completed_at = timezone.now()
+        report.save(update_fields=['status', 'error_message', 'completed_at', 'updated_at'])
+        return report
+    
+    report.status = 'completed'
+    report.progress_percentage = 100
+    report.completed_at = timezone.now()
+    report.file_size = file_size
+    report.total_records = progress.done
+    report.save(update_fields=[
+        'status', 'progress_percentage', 'completed_at', 'report_file',
+        'file_size', 'total_records', 'updated_at'
+    ])
+    return report
+
+
+def generate_pending(limit=10):
+    """Claim and generate up to limit pending reports"""
+    return [generate(report_id) for report_id in claim(limit)]
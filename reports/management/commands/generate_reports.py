@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from reports.generation import generate_pending
+
+
+class Command(BaseCommand):
+    help = 'Generate pending reports; run from cron to keep generation off the web workers'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Reports generated per run'
+        )
+    
+    def handle(self, *args, **options):
+        reports = generate_pending(options['limit'])
+        failed = sum(report.status == 'failed' for report in reports)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(reports) - failed} reports, {failed} failed'
+        ))
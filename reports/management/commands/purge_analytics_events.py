@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reports.models import AnalyticsEvent
+
+
+class Command(BaseCommand):
+    help = 'Delete analytics events older than the retention period'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SACCO_SETTINGS['ANALYTICS_EVENT_RETENTION_DAYS'],
+            help='Keep events recorded within this many days'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Rows deleted per transaction'
+        )
+    
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = AnalyticsEvent.objects.purge(before, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} analytics events'))
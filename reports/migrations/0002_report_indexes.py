@@ -0,0 +1,48 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_member_trigram_indexes'),
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='kpimetric',
+            index=models.Index(fields=['is_active', 'last_calculated'], name='reports_kpi_is_acti_9b7365_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['-created_at'], name='reports_rep_created_f226dd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', '-created_at'], name='reports_rep_status_7dd5e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['template', '-created_at'], name='reports_rep_templat_c56fbf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['requested_by', '-created_at'], name='reports_rep_request_692051_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['status', 'requested_at'], name='reports_rep_status_6c0213_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportaccess',
+            index=models.Index(fields=['report', '-accessed_at'], name='reports_rep_report__f2a63c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledreport',
+            index=models.Index(fields=['status', 'next_run'], name='reports_sch_status_71bf46_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_report_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='dashboardwidget',
+            name='cache_expires',
+        ),
+        migrations.RemoveField(
+            model_name='dashboardwidget',
+            name='cached_data',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0003_widget_data_in_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kpimetric',
+            name='status',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('current_value__isnull', True), ('current_value', 0), _connector='OR'), then=models.Value('unknown')), models.When(models.Q(('critical_threshold', 0), _negated=True), current_value__lte=models.F('critical_threshold'), then=models.Value('critical')), models.When(models.Q(('warning_threshold', 0), _negated=True), current_value__lte=models.F('warning_threshold'), then=models.Value('warning')), default=models.Value('good')), output_field=models.CharField(max_length=8)),
+        ),
+        migrations.AddField(
+            model_name='kpimetric',
+            name='trend',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(models.Q(('current_value__isnull', True), ('current_value', 0), ('previous_value__isnull', True), ('previous_value', 0), _connector='OR'), then=models.Value('neutral')), models.When(current_value__gt=models.F('previous_value'), then=models.Value('up')), models.When(current_value__lt=models.F('previous_value'), then=models.Value('down')), default=models.Value('neutral')), output_field=models.CharField(max_length=8)),
+        ),
+        migrations.AddIndex(
+            model_name='kpimetric',
+            index=models.Index(fields=['status'], name='reports_kpi_status_7a06fa_idx'),
+        ),
+    ]
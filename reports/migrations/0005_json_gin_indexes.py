@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+# Role checks filter on allowed_roles__contains=[role] and analytics
+# queries on properties; GIN indexes let PostgreSQL answer those jsonb
+# lookups without scanning every row. jsonb_path_ops is enough for the
+# containment-only role checks and gives a smaller index.
+GIN_INDEXES = [
+    ('report_template_roles_gin', 'reports_reporttemplate', 'allowed_roles jsonb_path_ops'),
+    ('dashboard_roles_gin', 'reports_dashboard', 'allowed_roles jsonb_path_ops'),
+    ('analytics_event_props_gin', 'reports_analyticsevent', 'properties'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column})')
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_kpi_generated_trend_status'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
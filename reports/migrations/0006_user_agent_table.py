@@ -0,0 +1,83 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:48
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LOGS = ['reportaccess', 'analyticsevent']
+
+
+def intern_user_agents(apps, schema_editor):
+    """Point each log row at a UserAgent row holding its string"""
+    UserAgent = apps.get_model('reports', 'UserAgent')
+    ids = {}
+    for model_name in LOGS:
+        model = apps.get_model('reports', model_name)
+        rows = model.objects.exclude(user_agent__isnull=True).exclude(user_agent='')
+        for value in rows.values_list('user_agent', flat=True).distinct().iterator():
+            if value not in ids:
+                digest = hashlib.sha1(value.encode('utf-8')).digest()
+                ids[value] = UserAgent.objects.get_or_create(
+                    sha1=digest, defaults={'value': value}
+                )[0].pk
+            rows.filter(user_agent=value).update(user_agent_ref=ids[value])
+
+
+def restore_user_agents(apps, schema_editor):
+    UserAgent = apps.get_model('reports', 'UserAgent')
+    for model_name in LOGS:
+        model = apps.get_model('reports', model_name)
+        for user_agent in UserAgent.objects.iterator():
+            model.objects.filter(user_agent_ref=user_agent.pk).update(user_agent=user_agent.value)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0005_json_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha1', models.BinaryField(max_length=20, unique=True)),
+                ('value', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'User Agent',
+                'verbose_name_plural': 'User Agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='analyticsevent',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='analytics_events', to='reports.useragent'),
+        ),
+        migrations.AddField(
+            model_name='reportaccess',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='report_accesses', to='reports.useragent'),
+        ),
+        migrations.RunPython(intern_user_agents, restore_user_agents),
+        migrations.RemoveField(
+            model_name='analyticsevent',
+            name='user_agent',
+        ),
+        migrations.RemoveField(
+            model_name='reportaccess',
+            name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='analyticsevent',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='reportaccess',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+    ]
@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# These tables are append-only, so each timestamp follows the physical
+# row order and a BRIN index answers time-range scans from a few pages
+BRIN_INDEXES = [
+    ('report_created_brin', 'reports_report', 'created_at'),
+    ('report_requested_brin', 'reports_report', 'requested_at'),
+    ('report_access_accessed_brin', 'reports_reportaccess', 'accessed_at'),
+    ('analytics_event_ts_brin', 'reports_analyticsevent', 'timestamp'),
+]
+
+
+def create_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in BRIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING brin ({column}) WITH (pages_per_range = 32)'
+        )
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in BRIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_user_agent_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
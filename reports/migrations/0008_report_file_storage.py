@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:50
+
+import reports.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0007_timestamp_brin_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='report_file',
+            field=models.FileField(blank=True, null=True, storage=reports.models.report_storage, upload_to='reports/'),
+        ),
+    ]
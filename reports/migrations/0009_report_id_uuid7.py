@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:52
+
+import notifications.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_report_file_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='report_id',
+            field=models.UUIDField(default=notifications.models.uuid7, editable=False, unique=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-15 10:55
+
+import reports.data_sources
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0009_report_id_uuid7'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardwidget',
+            name='data_source_key',
+            field=models.CharField(blank=True, choices=reports.data_sources.data_source_choices, help_text='Named query from reports.data_sources', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='dashboardwidget',
+            name='data_source',
+            field=models.TextField(blank=True, help_text='Deprecated: SQL query or data source configuration; use data_source_key'),
+        ),
+    ]
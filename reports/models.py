@@ -1,11 +1,55 @@
 from django.db import models
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage, storages
 from django.core.validators import MinValueValidator, MaxValueValidator
-from datetime import date, datetime
-import uuid
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import calendar
+import hashlib
+import threading
 
+from notifications.models import uuid7
 
-class ReportTemplate(models.Model):
+from .data_sources import data_source_choices, run_data_source
+
+# Events held by AnalyticsEvent.objects.buffered(), per thread
+_event_buffer = threading.local()
+
+# UserAgent ids by SHA-1 of the string, for rows known to be committed
+_user_agent_ids = {}
+
+
+class CachedConfigMixin:
+    """get_cached() for read-mostly configuration rows
+    
+    Rows are kept in the configured cache for CONFIG_CACHE_TIMEOUT seconds
+    and dropped whenever they are saved or deleted.
+    """
+    
+    CONFIG_CACHE_TIMEOUT = 3600
+    
+    @classmethod
+    def config_cache_key(cls, pk):
+        return f'reports:{cls.__name__}:{pk}'
+    
+    @classmethod
+    def get_cached(cls, pk):
+        """Return the row with this primary key, reading the cache first"""
+        key = cls.config_cache_key(pk)
+        obj = cache.get(key)
+        if obj is None:
+            obj = cls.objects.get(pk=pk)
+            cache.set(key, obj, cls.CONFIG_CACHE_TIMEOUT)
+        return obj
+
+
+class ReportTemplate(CachedConfigMixin, models.Model):
     """Templates for different types of reports"""
     
     REPORT_CATEGORIES = [
@@ -17,6 +61,9 @@ class ReportTemplate(models.Model):
         ('operational', 'Operational Reports'),
     ]
     
+    # Labels for __str__, which otherwise scans the field's choices per call
+    CATEGORY_LABELS = dict(REPORT_CATEGORIES)
+    
     REPORT_FORMATS = [
         ('pdf', 'PDF'),
         ('excel', 'Excel'),
@@ -58,7 +105,48 @@ class ReportTemplate(models.Model):
         verbose_name_plural = 'Report Templates'
     
     def __str__(self):
-        return f"{self.name} ({self.get_category_display()})"
+        return f"{self.name} ({self.CATEGORY_LABELS.get(self.category, self.category)})"
+
+
+def report_storage():
+    """Storage for generated report files
+    
+    The 'reports' alias in STORAGES when one is configured, so report
+    files can be kept in object storage (e.g. S3 through django-storages,
+    whose url() returns short-lived signed links) while other uploads stay
+    on the default storage.
+    """
+    if 'reports' in settings.STORAGES:
+        return storages['reports']
+    return default_storage
+
+
+def user_prefetch(lookup, *fields):
+    """Prefetch of the users at lookup loading only their id and fields"""
+    return models.Prefetch(lookup, queryset=get_user_model().objects.only('id', *fields))
+
+
+class ReportQuerySet(models.QuerySet):
+    
+    def with_sharing(self):
+        """Prefetch the filter and sharing lists with only the columns shown"""
+        from members.models import Member
+        
+        return self.prefetch_related(
+            user_prefetch('shared_with', 'username', 'email'),
+            models.Prefetch(
+                'filtered_members',
+                queryset=Member.objects.only('id', 'member_number', 'full_name')
+            ),
+            user_prefetch('filtered_loan_officers', 'username'),
+        )
+
+
+class ReportManager(models.Manager.from_queryset(ReportQuerySet)):
+    """Manager joining in the template and the requesting and approving users"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('template', 'requested_by', 'approved_by')
 
 
 class Report(models.Model):
@@ -79,7 +167,7 @@ class Report(models.Model):
         ('html', 'HTML'),
     ]
     
-    report_id = models.UUIDField(default=uuid.uuid4, editable=False, unique=True)
+    report_id = models.UUIDField(default=uuid7, editable=False, unique=True)
     template = models.ForeignKey(
         ReportTemplate,
         on_delete=models.CASCADE,
@@ -118,7 +206,7 @@ class Report(models.Model):
     completed_at = models.DateTimeField(null=True, blank=True)
     
     # Files
-    report_file = models.FileField(upload_to='reports/', blank=True, null=True)
+    report_file = models.FileField(upload_to='reports/', storage=report_storage, blank=True, null=True)
     file_size = models.PositiveIntegerField(default=0)  # Size in bytes
     
     # Data and Statistics
@@ -155,10 +243,20 @@ class Report(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ReportManager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Report'
         verbose_name_plural = 'Reports'
+        indexes = [
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['template', '-created_at']),
+            models.Index(fields=['requested_by', '-created_at']),
+            # Pending reports in request order, for the generation worker
+            models.Index(fields=['status', 'requested_at']),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.requested_at.strftime('%Y-%m-%d')}"
@@ -174,9 +272,30 @@ class Report(models.Model):
         return round(self.file_size / (1024 * 1024), 2) if self.file_size else 0
     
     def mark_as_downloaded(self):
-        """Increment download count"""
+        """Increment download count
+        
+        The count is raised in the database, so concurrent downloads are
+        all counted.
+        """
+        Report.objects.filter(pk=self.pk).update(download_count=models.F('download_count') + 1)
         self.download_count += 1
-        self.save(update_fields=['download_count'])
+
+
+class ScheduledReportQuerySet(models.QuerySet):
+    
+    def with_recipients(self):
+        """Prefetch the recipients with only the columns needed to send to them"""
+        return self.prefetch_related(user_prefetch('recipients', 'username', 'email'))
+    
+    def due(self, now=None):
+        """Active schedules whose next run has come, earliest first"""
+        return self.filter(
+            status='active', next_run__lte=now or timezone.now()
+        ).order_by('next_run')
+    
+    def due_ids(self, limit=200, now=None):
+        """Ids of up to limit due schedules, for a scheduler to hand out"""
+        return list(self.due(now).values_list('pk', flat=True)[:limit])
 
 
 class ScheduledReport(models.Model):
@@ -190,12 +309,22 @@ class ScheduledReport(models.Model):
         ('yearly', 'Yearly'),
     ]
     
+    FREQUENCY_LABELS = dict(FREQUENCY_CHOICES)
+    
     STATUS_CHOICES = [
         ('active', 'Active'),
         ('paused', 'Paused'),
         ('inactive', 'Inactive'),
     ]
     
+    # Fields next_run is derived from
+    SCHEDULE_FIELDS = frozenset([
+        'frequency', 'run_time', 'day_of_week', 'day_of_month', 'status', 'last_run'
+    ])
+    
+    # Months between runs of the month-based frequencies
+    MONTHS_BETWEEN_RUNS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+    
     name = models.CharField(max_length=100)
     template = models.ForeignKey(
         ReportTemplate,
@@ -249,13 +378,77 @@ class ScheduledReport(models.Model):
         related_name='created_scheduled_reports'
     )
     
+    objects = ScheduledReportQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
         verbose_name = 'Scheduled Report'
         verbose_name_plural = 'Scheduled Reports'
+        indexes = [
+            # Active schedules that are due, for the scheduler
+            models.Index(fields=['status', 'next_run']),
+        ]
     
     def __str__(self):
-        return f"{self.name} ({self.get_frequency_display()})"
+        return f"{self.name} ({self.FREQUENCY_LABELS.get(self.frequency, self.frequency)})"
+    
+    def save(self, *args, **kwargs):
+        # next_run is stored so the scheduler only polls the (status, next_run)
+        # index instead of working out in Python which schedules are due
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or self.SCHEDULE_FIELDS.intersection(update_fields):
+            self.next_run = self.compute_next_run(self.last_run) if self.status == 'active' else None
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'next_run'}
+        super().save(*args, **kwargs)
+    
+    def compute_next_run(self, after=None):
+        """First run time strictly after after, or after now if not given"""
+        from loans.models import add_months
+        
+        after = timezone.localtime(after or timezone.now())
+        run_time = self._meta.get_field('run_time').to_python(self.run_time)
+        
+        def at(day):
+            return timezone.make_aware(datetime.combine(day, run_time))
+        
+        today = after.date()
+        if self.frequency == 'daily':
+            candidate = at(today)
+            return candidate if candidate > after else at(today + timedelta(days=1))
+        if self.frequency == 'weekly':
+            weekday = today.weekday() if self.day_of_week is None else self.day_of_week
+            candidate = at(today + timedelta(days=(weekday - today.weekday()) % 7))
+            return candidate if candidate > after else candidate + timedelta(days=7)
+        
+        day = self.day_of_month or today.day
+        
+        def in_month(first):
+            return at(first.replace(day=min(day, calendar.monthrange(first.year, first.month)[1])))
+        
+        first = today.replace(day=1)
+        candidate = in_month(first)
+        if candidate > after:
+            return candidate
+        return in_month(add_months(first, self.MONTHS_BETWEEN_RUNS.get(self.frequency, 1)))
+    
+    def record_run(self):
+        """Count a run of the schedule and move next_run on, with one UPDATE"""
+        now = timezone.now()
+        self.next_run = self.compute_next_run(now)
+        ScheduledReport.objects.filter(pk=self.pk).update(
+            run_count=models.F('run_count') + 1, last_run=now, next_run=self.next_run,
+            updated_at=now
+        )
+        self.run_count += 1
+        self.last_run = now
+
+
+class DashboardQuerySet(models.QuerySet):
+    
+    def with_sharing(self):
+        """Prefetch the users a dashboard is shared with, with only the columns shown"""
+        return self.prefetch_related(user_prefetch('shared_with', 'username', 'email'))
 
 
 class Dashboard(models.Model):
@@ -269,6 +462,8 @@ class Dashboard(models.Model):
         ('custom', 'Custom Dashboard'),
     ]
     
+    DASHBOARD_TYPE_LABELS = dict(DASHBOARD_TYPES)
+    
     name = models.CharField(max_length=100)
     dashboard_type = models.CharField(max_length=20, choices=DASHBOARD_TYPES)
     description = models.TextField(blank=True, null=True)
@@ -297,13 +492,22 @@ class Dashboard(models.Model):
         related_name='created_dashboards'
     )
     
+    objects = DashboardQuerySet.as_manager()
+    
     class Meta:
         ordering = ['name']
         verbose_name = 'Dashboard'
         verbose_name_plural = 'Dashboards'
     
     def __str__(self):
-        return f"{self.name} ({self.get_dashboard_type_display()})"
+        return f"{self.name} ({self.DASHBOARD_TYPE_LABELS.get(self.dashboard_type, self.dashboard_type)})"
+
+
+class DashboardWidgetManager(models.Manager):
+    """Manager joining in the dashboard every widget is listed under"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('dashboard')
 
 
 class DashboardWidget(models.Model):
@@ -347,7 +551,16 @@ class DashboardWidget(models.Model):
     height = models.PositiveIntegerField(default=3)
     
     # Data Configuration
-    data_source = models.TextField(help_text="SQL query or data source configuration")
+    data_source_key = models.CharField(
+        max_length=64,
+        choices=data_source_choices,
+        blank=True,
+        help_text="Named query from reports.data_sources"
+    )
+    data_source = models.TextField(
+        blank=True,
+        help_text="Deprecated: SQL query or data source configuration; use data_source_key"
+    )
     parameters = models.JSONField(default=dict)
     chart_config = models.JSONField(default=dict, help_text="Chart styling and configuration")
     
@@ -355,15 +568,13 @@ class DashboardWidget(models.Model):
     auto_refresh = models.BooleanField(default=True)
     refresh_interval = models.PositiveIntegerField(default=300, help_text="Refresh interval in seconds")
     
-    # Cache
-    cached_data = models.JSONField(blank=True, null=True)
-    cache_expires = models.DateTimeField(null=True, blank=True)
-    
     is_active = models.BooleanField(default=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = DashboardWidgetManager()
+    
     class Meta:
         ordering = ['dashboard', 'position_y', 'position_x']
         verbose_name = 'Dashboard Widget'
@@ -371,9 +582,36 @@ class DashboardWidget(models.Model):
     
     def __str__(self):
         return f"{self.dashboard.name} - {self.title}"
+    
+    @property
+    def cache_key(self):
+        return f'reports:widget:{self.pk}'
+    
+    def get_cached(self):
+        """Data stored by set_cached(), or None once refresh_interval has passed
+        
+        Widget data lives in the configured cache rather than in the
+        widget's row, so refreshing a widget does not write to the database.
+        """
+        return cache.get(self.cache_key)
+    
+    def set_cached(self, data):
+        """Keep data for this widget for refresh_interval seconds"""
+        cache.set(self.cache_key, data, timeout=self.refresh_interval)
+    
+    def clear_cached(self):
+        cache.delete(self.cache_key)
+    
+    def get_data(self):
+        """Rows of the widget's data source, from the cache while still fresh"""
+        data = self.get_cached()
+        if data is None:
+            data = run_data_source(self.data_source_key, self.parameters)
+            self.set_cached(data)
+        return data
 
 
-class KPIMetric(models.Model):
+class KPIMetric(CachedConfigMixin, models.Model):
     """Key Performance Indicators and metrics"""
     
     METRIC_TYPES = [
@@ -416,6 +654,44 @@ class KPIMetric(models.Model):
     previous_value = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
     last_calculated = models.DateTimeField(null=True, blank=True)
     
+    # Computed by the database whenever the values change; a missing or
+    # zero value or threshold counts as unset
+    trend = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                models.Q(current_value__isnull=True) | models.Q(current_value=0) |
+                models.Q(previous_value__isnull=True) | models.Q(previous_value=0),
+                then=models.Value('neutral')
+            ),
+            models.When(current_value__gt=models.F('previous_value'), then=models.Value('up')),
+            models.When(current_value__lt=models.F('previous_value'), then=models.Value('down')),
+            default=models.Value('neutral')
+        ),
+        output_field=models.CharField(max_length=8),
+        db_persist=True
+    )
+    status = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                models.Q(current_value__isnull=True) | models.Q(current_value=0),
+                then=models.Value('unknown')
+            ),
+            models.When(
+                ~models.Q(critical_threshold=0),
+                current_value__lte=models.F('critical_threshold'),
+                then=models.Value('critical')
+            ),
+            models.When(
+                ~models.Q(warning_threshold=0),
+                current_value__lte=models.F('warning_threshold'),
+                then=models.Value('warning')
+            ),
+            default=models.Value('good')
+        ),
+        output_field=models.CharField(max_length=8),
+        db_persist=True
+    )
+    
     # Settings
     is_active = models.BooleanField(default=True)
     is_public = models.BooleanField(default=True)
@@ -428,35 +704,87 @@ class KPIMetric(models.Model):
         ordering = ['name']
         verbose_name = 'KPI Metric'
         verbose_name_plural = 'KPI Metrics'
+        indexes = [
+            models.Index(fields=['is_active', 'last_calculated']),
+            models.Index(fields=['status']),
+        ]
     
     def __str__(self):
         return self.name
     
-    @property
-    def trend(self):
-        """Calculate trend compared to previous value"""
-        if not self.current_value or not self.previous_value:
-            return 'neutral'
+    def record_value(self, new_value):
+        """Store a newly calculated value, moving the current one to previous_value
         
-        if self.current_value > self.previous_value:
-            return 'up'
-        elif self.current_value < self.previous_value:
-            return 'down'
-        else:
-            return 'neutral'
+        Done with one UPDATE, so the shift of current_value to
+        previous_value cannot interleave with another recalculation.
+        """
+        now = timezone.now()
+        KPIMetric.objects.filter(pk=self.pk).update(
+            previous_value=models.F('current_value'),
+            current_value=new_value,
+            last_calculated=now
+        )
+        cache.delete(self.config_cache_key(self.pk))
+        self.previous_value = self.current_value
+        self.current_value = new_value
+        self.last_calculated = now
+        self.refresh_from_db(fields=['trend', 'status'])
+
+
+class UserAgentManager(models.Manager):
+    """Manager storing each distinct user agent string once"""
     
-    @property
-    def status(self):
-        """Get status based on thresholds"""
-        if not self.current_value:
-            return 'unknown'
+    cache_size = 4096
+    
+    def id_for(self, value):
+        """Id of the UserAgent row for this string, created if new
         
-        if self.critical_threshold and self.current_value <= self.critical_threshold:
-            return 'critical'
-        elif self.warning_threshold and self.current_value <= self.warning_threshold:
-            return 'warning'
-        else:
-            return 'good'
+        Ids are kept in the process once their row is committed, so
+        logging a known user agent needs no query.
+        """
+        if not value:
+            return None
+        digest = hashlib.sha1(value.encode('utf-8')).digest()
+        pk = _user_agent_ids.get(digest)
+        if pk is None:
+            pk = self.get_or_create(sha1=digest, defaults={'value': value})[0].pk
+            transaction.on_commit(lambda: self._remember(digest, pk))
+        return pk
+    
+    def _remember(self, digest, pk):
+        if len(_user_agent_ids) >= self.cache_size:
+            _user_agent_ids.clear()
+        _user_agent_ids[digest] = pk
+
+
+class UserAgent(models.Model):
+    """Distinct user agent strings, stored once and referenced from the logs"""
+    
+    sha1 = models.BinaryField(max_length=20, unique=True)
+    value = models.TextField()
+    
+    objects = UserAgentManager()
+    
+    class Meta:
+        verbose_name = 'User Agent'
+        verbose_name_plural = 'User Agents'
+    
+    def __str__(self):
+        return self.value
+
+
+class ReportAccessManager(models.Manager):
+    """Manager joining in the user and report each access log entry names"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('user', 'report')
+    
+    def record(self, report, user, action, ip_address=None, user_agent=None):
+        """Log an access, storing the user agent string by reference"""
+        return self.create(
+            report=report, user=user, action=action, ip_address=ip_address,
+            user_agent_id=UserAgent.objects.id_for(user_agent)
+        )
 
 
 class ReportAccess(models.Model):
@@ -482,19 +810,37 @@ class ReportAccess(models.Model):
     
     action = models.CharField(max_length=20, choices=ACTION_TYPES)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True, null=True)
+    user_agent = models.ForeignKey(
+        UserAgent,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='report_accesses'
+    )
     
     accessed_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ReportAccessManager()
+    
     class Meta:
         ordering = ['-accessed_at']
         verbose_name = 'Report Access'
         verbose_name_plural = 'Report Access Logs'
+        indexes = [
+            models.Index(fields=['report', '-accessed_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} {self.action} {self.report.title}"
 
 
+class ReportBookmarkManager(models.Manager):
+    """Manager joining in the bookmarking user and the bookmarked template"""
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('user', 'report_template')
+
+
 class ReportBookmark(models.Model):
     """User bookmarks for frequently accessed reports"""
     
@@ -515,6 +861,8 @@ class ReportBookmark(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = ReportBookmarkManager()
+    
     class Meta:
         unique_together = ['user', 'report_template', 'bookmark_name']
         ordering = ['bookmark_name']
@@ -525,6 +873,75 @@ class ReportBookmark(models.Model):
         return f"{self.user.username} - {self.bookmark_name}"
 
 
+class AnalyticsEventManager(models.Manager):
+    """Manager joining in the user and member an event was recorded for"""
+    
+    flush_size = 500
+    
+    def get_queryset(self):
+        return super().get_queryset().select_related('user', 'member')
+    
+    def record(self, event_type, event_name, properties=None, **context):
+        """Record an event, batched when inside buffered()
+        
+        context takes the remaining fields: user, member, ip_address,
+        user_agent and session_id. user_agent may be given as the string.
+        """
+        if isinstance(context.get('user_agent'), str):
+            context['user_agent_id'] = UserAgent.objects.id_for(context.pop('user_agent'))
+        event = self.model(
+            event_type=event_type, event_name=event_name,
+            properties=properties or {}, **context
+        )
+        events = getattr(_event_buffer, 'events', None)
+        if events is None:
+            event.save()
+            return
+        events.append(event)
+        if len(events) >= self.flush_size:
+            self.flush()
+    
+    def purge(self, before, chunk_size=10000):
+        """Delete events recorded before the given datetime, chunk_size rows per transaction"""
+        deleted = 0
+        while True:
+            ids = list(
+                self.filter(timestamp__lt=before).order_by('timestamp')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return deleted
+            deleted += self.filter(pk__in=ids).delete()[0]
+    
+    def flush(self):
+        events = getattr(_event_buffer, 'events', None)
+        if events:
+            self.bulk_create(events, batch_size=1000)
+            events.clear()
+    
+    @contextmanager
+    def buffered(self):
+        """Collect the events record()ed inside the block into bulk inserts
+            
+            with AnalyticsEvent.objects.buffered():
+                for payment in payments:
+                    AnalyticsEvent.objects.record('payment_received', 'Repayment', member=payment.member)
+        
+        Events are written every flush_size records and when the block
+        exits; if it raises, events not yet flushed are dropped.
+        """
+        if getattr(_event_buffer, 'events', None) is not None:
+            # Nested block; the outermost one flushes
+            yield
+            return
+        _event_buffer.events = []
+        try:
+            yield
+            self.flush()
+        finally:
+            _event_buffer.events = None
+
+
 class AnalyticsEvent(models.Model):
     """Track analytics events for business intelligence"""
     
@@ -565,11 +982,19 @@ class AnalyticsEvent(models.Model):
     
     # Technical Details
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True, null=True)
+    user_agent = models.ForeignKey(
+        UserAgent,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='analytics_events'
+    )
     session_id = models.CharField(max_length=100, blank=True, null=True)
     
     timestamp = models.DateTimeField(auto_now_add=True)
     
+    objects = AnalyticsEventManager()
+    
     class Meta:
         ordering = ['-timestamp']
         verbose_name = 'Analytics Event'
@@ -582,3 +1007,9 @@ class AnalyticsEvent(models.Model):
     
     def __str__(self):
         return f"{self.event_name} - {self.timestamp.strftime('%Y-%m-%d %H:%M')}"
+
+
+@receiver([post_save, post_delete], sender=ReportTemplate)
+@receiver([post_save, post_delete], sender=KPIMetric)
+def clear_cached_config(sender, instance, **kwargs):
+    cache.delete(sender.config_cache_key(instance.pk))
@@ -1,3 +1,188 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import datetime, time, timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from members.models import User
+
+from . import generation
+from .models import Report, ReportTemplate, ScheduledReport
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class ScheduledReportNextRunTests(TestCase):
+    
+    def setUp(self):
+        self.template = ReportTemplate.objects.create(
+            name='Portfolio', description='Loan portfolio', category='loan',
+            query_template='SELECT 1', column_definitions={}
+        )
+        # A Thursday, after the default 08:00 run time
+        self.after = local(2026, 10, 15, 9, 0)
+    
+    def next_run(self, frequency, after=None, **kwargs):
+        schedule = ScheduledReport(
+            name='Schedule', template=self.template, frequency=frequency, **kwargs
+        )
+        return schedule.compute_next_run(after or self.after)
+    
+    def test_daily(self):
+        self.assertEqual(self.next_run('daily'), local(2026, 10, 16, 8, 0))
+        self.assertEqual(self.next_run('daily', run_time=time(18)), local(2026, 10, 15, 18, 0))
+    
+    def test_weekly_wraps_to_next_week(self):
+        self.assertEqual(self.next_run('weekly', day_of_week=0), local(2026, 10, 19, 8, 0))
+        self.assertEqual(self.next_run('weekly', day_of_week=6), local(2026, 10, 18, 8, 0))
+        # Today's run has passed, so the same weekday next week
+        self.assertEqual(self.next_run('weekly', day_of_week=3), local(2026, 10, 22, 8, 0))
+        self.assertEqual(self.next_run('weekly'), local(2026, 10, 22, 8, 0))
+    
+    def test_monthly_clamps_to_short_months(self):
+        self.assertEqual(self.next_run('monthly', day_of_month=31), local(2026, 10, 31, 8, 0))
+        self.assertEqual(
+            self.next_run('monthly', after=local(2026, 10, 31, 9, 0), day_of_month=31),
+            local(2026, 11, 30, 8, 0)
+        )
+        self.assertEqual(
+            self.next_run('monthly', after=local(2027, 1, 31, 9, 0), day_of_month=31),
+            local(2027, 2, 28, 8, 0)
+        )
+        self.assertEqual(
+            self.next_run('monthly', after=local(2028, 1, 31, 9, 0), day_of_month=30),
+            local(2028, 2, 29, 8, 0)
+        )
+        self.assertEqual(self.next_run('monthly', day_of_month=15), local(2026, 11, 15, 8, 0))
+    
+    def test_quarterly_and_yearly_roll_over_the_year(self):
+        self.assertEqual(self.next_run('quarterly', day_of_month=1), local(2027, 1, 1, 8, 0))
+        self.assertEqual(
+            self.next_run('quarterly', after=local(2026, 11, 30, 9, 0), day_of_month=31),
+            local(2027, 2, 28, 8, 0)
+        )
+        self.assertEqual(self.next_run('yearly'), local(2027, 10, 15, 8, 0))
+        self.assertEqual(self.next_run('yearly', day_of_month=20), local(2026, 10, 20, 8, 0))
+    
+    def test_next_run_is_strictly_after(self):
+        self.assertEqual(
+            self.next_run('daily', after=local(2026, 10, 15, 8, 0)), local(2026, 10, 16, 8, 0)
+        )
+
+
+class ScheduledReportSaveTests(TestCase):
+    
+    def setUp(self):
+        self.template = ReportTemplate.objects.create(
+            name='Portfolio', description='Loan portfolio', category='loan',
+            query_template='SELECT 1', column_definitions={}
+        )
+        self.schedule = ScheduledReport.objects.create(
+            name='Daily portfolio', template=self.template, frequency='daily', run_time=time(8)
+        )
+    
+    def stored_next_run(self):
+        return ScheduledReport.objects.values_list('next_run', flat=True).get(pk=self.schedule.pk)
+    
+    def test_next_run_is_stored_on_create(self):
+        self.assertIsNotNone(self.schedule.next_run)
+        self.assertGreater(self.schedule.next_run, timezone.now())
+        self.assertEqual(self.stored_next_run(), self.schedule.next_run)
+    
+    def test_narrow_save_of_a_schedule_field_writes_next_run(self):
+        self.schedule.last_run = local(2026, 1, 1, 8, 0)
+        self.schedule.save(update_fields=['last_run'])
+        self.assertEqual(self.stored_next_run(), local(2026, 1, 2, 8, 0))
+    
+    def test_narrow_save_of_other_fields_leaves_next_run(self):
+        ScheduledReport.objects.filter(pk=self.schedule.pk).update(next_run=local(2026, 1, 1, 8, 0))
+        self.schedule.name = 'Renamed'
+        self.schedule.save(update_fields=['name'])
+        self.assertEqual(self.stored_next_run(), local(2026, 1, 1, 8, 0))
+    
+    def test_paused_schedules_have_no_next_run(self):
+        self.schedule.status = 'paused'
+        self.schedule.save()
+        self.assertIsNone(self.stored_next_run())
+        self.schedule.status = 'active'
+        self.schedule.save(update_fields=['status'])
+        self.assertIsNotNone(self.stored_next_run())
+    
+    def test_due_ids_and_record_run(self):
+        self.schedule.last_run = local(2026, 1, 1, 8, 0)
+        self.schedule.save()
+        paused = ScheduledReport.objects.create(
+            name='Paused', template=self.template, frequency='daily', status='paused'
+        )
+        self.assertEqual(ScheduledReport.objects.due_ids(), [self.schedule.pk])
+        self.assertNotIn(paused.pk, ScheduledReport.objects.due_ids())
+        
+        self.schedule.record_run()
+        
+        stored = ScheduledReport.objects.get(pk=self.schedule.pk)
+        self.assertEqual(stored.run_count, 1)
+        self.assertEqual(stored.next_run, self.schedule.next_run)
+        self.assertGreater(stored.next_run, timezone.now())
+        self.assertLessEqual(stored.next_run, timezone.now() + timedelta(days=1))
+        self.assertEqual(ScheduledReport.objects.due_ids(), [])
+
+
+class ReportGenerationTests(TestCase):
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        for number in range(5):
+            User.objects.create(username=f'user{number}')
+        template = ReportTemplate.objects.create(
+            name='Users', description='Users', category='member',
+            query_template='SELECT username FROM members_user ORDER BY username',
+            column_definitions={}
+        )
+        self.report = Report.objects.create(
+            template=template, title='Users', format='csv', requested_by=User.objects.first()
+        )
+    
+    def test_runs_the_template_query_once(self):
+        self.assertEqual(generation.claim(), [self.report.pk])
+        with CaptureQueriesContext(connection) as queries:
+            report = generation.generate(self.report.pk)
+        self.assertEqual(
+            [query['sql'] for query in queries if 'FROM members_user' in query['sql']],
+            ['SELECT username FROM members_user ORDER BY username']
+        )
+        self.assertEqual(
+            (report.status, report.progress_percentage, report.total_records), ('completed', 100, 5)
+        )
+        with report.report_file.open('rb') as output:
+            self.assertEqual(
+                output.read().decode().splitlines(),
+                ['username', *[f'user{number}' for number in range(5)]]
+            )
+    
+    def test_rows_written_are_reported_while_generating(self):
+        original, generation.PROGRESS_ROWS = generation.PROGRESS_ROWS, 2
+        self.addCleanup(setattr, generation, 'PROGRESS_ROWS', original)
+        progress = generation.Progress(self.report.pk)
+        for done in range(1, 6):
+            progress(done)
+            if done == 3:
+                self.report.refresh_from_db()
+                self.assertEqual(self.report.total_records, 2)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.total_records, 4)
+    
+    def test_failures_are_recorded_on_the_report(self):
+        ReportTemplate.objects.filter(pk=self.report.template_id).update(
+            query_template='SELECT missing FROM nowhere'
+        )
+        with self.assertLogs('reports.generation', 'ERROR'):
+            report = generation.generate(self.report.pk)
+        self.assertEqual(report.status, 'failed')
+        self.assertIn('nowhere', report.error_message)
@@ -235,6 +235,9 @@ SACCO_SETTINGS = {
     'CURRENCY': config('CURRENCY', default='KES'),
     'SMS_PROVIDER': config('SMS_PROVIDER', default=''),
     'SMS_API_KEY': config('SMS_API_KEY', default=''),
+    'NOTIFICATION_BATCH_SIZE': config('NOTIFICATION_BATCH_SIZE', default=500, cast=int),
+    'NOTIFICATION_LOG_RETENTION_DAYS': config('NOTIFICATION_LOG_RETENTION_DAYS', default=365, cast=int),
+    'ANALYTICS_EVENT_RETENTION_DAYS': config('ANALYTICS_EVENT_RETENTION_DAYS', default=730, cast=int),
     'MPESA_CONSUMER_KEY': config('MPESA_CONSUMER_KEY', default=''),
     'MPESA_CONSUMER_SECRET': config('MPESA_CONSUMER_SECRET', default=''),
     'MPESA_SHORTCODE': config('MPESA_SHORTCODE', default=''),
@@ -19,11 +19,13 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import RedirectView
+from django.views.decorators.cache import cache_control
+from django.views.decorators.vary import vary_on_headers
 from django.http import HttpResponse
+import gzip
 
-def home_view(request):
-    """Simple home page view"""
-    return HttpResponse("""
+# The home page is constant, so it is encoded and compressed once at import
+_HOME_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -125,7 +127,21 @@ def home_view(request):
         </div>
     </body>
     </html>
-    """)
+    """.encode('utf-8')
+_HOME_GZIP = gzip.compress(_HOME_HTML)
+
+
+@cache_control(public=True, max_age=3600)
+@vary_on_headers('Accept-Encoding')
+def home_view(request):
+    """Simple home page view"""
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        return HttpResponse(
+            _HOME_GZIP,
+            content_type='text/html; charset=utf-8',
+            headers={'Content-Encoding': 'gzip'}
+        )
+    return HttpResponse(_HOME_HTML, content_type='text/html; charset=utf-8')
 
 urlpatterns = [
     # Home page
@@ -150,14 +166,17 @@ urlpatterns = [
     # path('dashboard/', include('dashboard.urls')),
 ]
 
-# Serve media files in development
+# Serve media files and the debug toolbar in development
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-    urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
-    
-    # Add debug toolbar
+    debug_patterns = (
+        static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+        + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+    )
     if 'debug_toolbar' in settings.INSTALLED_APPS:
-        import debug_toolbar
-        urlpatterns = [
-            path('__debug__/', include(debug_toolbar.urls)),
-        ] + urlpatterns
+        try:
+            import debug_toolbar
+        except ImportError:
+            pass
+        else:
+            debug_patterns = [path('__debug__/', include(debug_toolbar.urls))] + debug_patterns
+    urlpatterns += debug_patterns